@@ -0,0 +1,120 @@
+"""Асинхронные версии частых переключателей: избранное, список покупок и
+подписка.
+
+Под ASGI-сервером синхронное DRF-представление занимает поток Django на
+всё время нескольких последовательных запросов к БД. Здесь event loop
+только разбирает запрос, а вся работа с БД (аутентификация, проверки,
+запись) выполняется одним вызовом в отдельном пуле потоков размера
+``ASYNC_DB_THREADS`` — он же ограничивает число соединений с БД.
+Логика и формат ответов общие с синхронными представлениями
+(``api.toggles``).
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import (AuthenticationFailed, MethodNotAllowed,
+                                       NotAuthenticated)
+from rest_framework.views import exception_handler
+
+from recipes.models import Favorite, ShoppingCart
+
+from . import db, toggles
+from .authentication import CachedTokenAuthentication
+from .renderers import ORJSONRenderer
+from .serializers import FavoriteSerializer, ShoppingCartSerializer
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix="async-db"
+)
+
+
+def render(data, status_code, headers=None):
+    response = HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def handle_request(request, handler, *args):
+    """Выполняется в пуле: аутентификация и обработчик одним заходом."""
+    close_old_connections()
+    db.check_connections()
+    try:
+        authenticator = CachedTokenAuthentication()
+        credentials = authenticator.authenticate(request)
+        if credentials is None:
+            raise NotAuthenticated()
+        request.user, request.auth = credentials
+        data, status_code = handler(request, *args)
+        return render(data, status_code)
+    except Exception as exc:
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            exc.auth_header = authenticator.authenticate_header(request)
+        response = exception_handler(exc, {"request": request})
+        if response is None:
+            raise
+        return render(response.data, response.status_code, response.headers)
+    finally:
+        close_old_connections()
+
+
+async def toggle(request, add, remove, *args):
+    if request.method == "GET":
+        handler = add
+    elif request.method == "DELETE":
+        handler = remove
+    else:
+        response = exception_handler(MethodNotAllowed(request.method), {})
+        return render(
+            response.data, response.status_code, {"Allow": "GET, DELETE"}
+        )
+    call = functools.partial(handle_request, request, handler, *args)
+    # Контекст копируется, чтобы Server-Timing видел запросы из пула.
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, context.run, call)
+
+
+def csrf_exempt(view):
+    """``django.views.decorators.csrf.csrf_exempt`` из Django 3.2 оборачивает
+    представление в синхронную функцию, поэтому флаг ставится напрямую.
+    Аутентификация здесь только по токену, как и в DRF.
+    """
+    view.csrf_exempt = True
+    return view
+
+
+@csrf_exempt
+async def favorite(request, id):
+    return await toggle(
+        request,
+        functools.partial(toggles.add_recipe, Favorite, FavoriteSerializer),
+        functools.partial(toggles.remove_recipe, Favorite),
+        id,
+    )
+
+
+@csrf_exempt
+async def shopping_cart(request, id):
+    return await toggle(
+        request,
+        functools.partial(
+            toggles.add_recipe, ShoppingCart, ShoppingCartSerializer
+        ),
+        functools.partial(toggles.remove_recipe, ShoppingCart),
+        id,
+    )
+
+
+@csrf_exempt
+async def subscribe(request, pk):
+    return await toggle(request, toggles.subscribe, toggles.unsubscribe, pk)
@@ -0,0 +1,93 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.authentication import TokenAuthentication
+
+REVOKED_KEY = "auth_token_revoked:{}"
+# Время жизни записей, если кэш Django свой у каждого процесса: отзыв
+# токена тогда не виден другим воркерам и действует через столько секунд.
+LOCAL_CACHE_TTL = 5
+
+
+class TokenUserCache:
+    """LRU-кэш «токен -> (пользователь, токен)» с ограниченным временем жизни.
+
+    Записи живут в памяти воркера. Отзыв хранится в кэше Django по id
+    пользователя, поэтому при общем бэкенде кэша (memcached, redis) он
+    виден всем воркерам, а при локальном — только текущему, и тогда
+    остальные забывают запись не позже чем через ``ttl`` секунд.
+
+    Каждый запрос получает свои копии пользователя и токена: изменения
+    одного запроса не видны параллельным.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_at, credentials = entry
+            if time.time() - cached_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        revoked_at = cache.get(REVOKED_KEY.format(credentials[0].pk))
+        if revoked_at is not None and revoked_at >= cached_at:
+            self.discard(key)
+            return None
+        return tuple(map(copy.copy, credentials))
+
+    def set(self, key, credentials):
+        credentials = tuple(map(copy.copy, credentials))
+        with self._lock:
+            self._entries[key] = (time.time(), credentials)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def revoke_user(self, user_id):
+        cache.set(REVOKED_KEY.format(user_id), time.time(), self.ttl)
+        with self._lock:
+            for key, (_, (user, _)) in list(self._entries.items()):
+                if user.pk == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def token_cache_ttl():
+    if isinstance(caches["default"], (LocMemCache, DummyCache)):
+        return min(settings.TOKEN_CACHE_TTL, LOCAL_CACHE_TTL)
+    return settings.TOKEN_CACHE_TTL
+
+
+token_cache = TokenUserCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=token_cache_ttl()
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        return credentials
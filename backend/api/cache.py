@@ -0,0 +1,176 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+VERSION_KEY = "response_cache_version:{}"
+RESPONSE_KEY = "response_cache:{}"
+# Версия сдвинулась недавно, и реплики могут ещё отдавать старые строки.
+RECENT_KEY = "response_cache_recent:{}"
+# Версия избранного, списка покупок и подписок одного пользователя.
+USER_LISTS_VERSION = "user_lists:{}"
+
+
+def get_versions(names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+_pending = threading.local()
+
+
+def bump_version(name):
+    """Увеличивает версию после коммита текущей транзакции.
+
+    До коммита другие запросы видят старые строки: прибавь версию раньше,
+    они сохранили бы старые данные в кэш и ETag под новой версией. Версии
+    из нескольких сигналов одной транзакции прибавляются по разу.
+    """
+    _pending.__dict__.setdefault("names", set()).add(name)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    names = _pending.__dict__.pop("names", ())
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+    if names and settings.REPLICA_DATABASES:
+        cache.set_many(
+            {RECENT_KEY.format(name): True for name in names},
+            settings.DB_REPLICA_STICKY_SECONDS,
+        )
+
+
+def recently_changed(names):
+    """Сдвигалась ли какая-то из версий за ``DB_REPLICA_STICKY_SECONDS``."""
+    if not names:
+        return False
+    return bool(cache.get_many([RECENT_KEY.format(name) for name in names]))
+
+
+def request_fingerprint(request, view, versions):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    raw = repr(
+        (
+            request.get_host(),
+            request.path,
+            view.basename,
+            view.action,
+            params,
+            versions,
+        )
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def build_cache_key(request, view, versions):
+    return RESPONSE_KEY.format(request_fingerprint(request, view, versions))
+
+
+class AnonymousResponseCacheMixin:
+    """Кэширует ответы list/retrieve для анонимных пользователей.
+
+    Ключ строится из нормализованных параметров запроса и версий моделей
+    из ``cache_dependencies``; сигналы моделей увеличивают версии, так что
+    устаревшие записи просто перестают находиться и вытесняются по
+    таймауту.
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = build_cache_key(
+            request, self, get_versions(self.cache_dependencies)
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    """ETag для ответов list/retrieve, проверяемый до сериализаторов.
+
+    Тег строится из тех же версий ``cache_dependencies``, что и ключ кэша
+    ответов, а для пользователя — ещё из версии его избранного, списка
+    покупок и подписок. Совпавший ``If-None-Match`` получает 304.
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_user_etag_parts(self, request):
+        if not request.user.is_authenticated:
+            return []
+        user_id = request.user.pk
+        return [user_id] + get_versions([USER_LISTS_VERSION.format(user_id)])
+
+    def get_etag_parts(self, request):
+        """Всё, от чего зависит ответ, кроме адреса и параметров запроса;
+        ``None`` отключает проверку."""
+        return get_versions(self.cache_dependencies) + (
+            self.get_user_etag_parts(request)
+        )
+
+    def get_last_modified(self, request):
+        return None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        parts = self.get_etag_parts(request)
+        if parts is None:
+            return handler(request, *args, **kwargs)
+        etag = quote_etag(request_fingerprint(request, self, parts))
+        last_modified = self.get_last_modified(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_vary_headers(response, ("Authorization",))
+        return response
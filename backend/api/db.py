@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+
+def check_connections():
+    """Проверяет постоянные соединения перед использованием в запросе.
+
+    Django 3.2 закрывает сам только просроченные по ``CONN_MAX_AGE`` и
+    сломанные после ошибки соединения (``CONN_HEALTH_CHECKS`` появился в
+    4.1), поэтому соединение, оборванное сервером БД или PgBouncer'ом за
+    время простоя, уронило бы первый же запрос. Закрытое здесь соединение
+    Django откроет заново при первом обращении.
+    """
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        labels = {"alias": connection.alias}
+        registry.increment("foodgram_db_connections_reused_total", labels)
+        if settings.DB_HEALTH_CHECKS and not connection.is_usable():
+            registry.increment(
+                "foodgram_db_health_check_failures_total", labels
+            )
+            connection.close()
+
+
+def count_opened_connection(connection):
+    registry.increment(
+        "foodgram_db_connections_opened_total", {"alias": connection.alias}
+    )
@@ -36,3 +36,33 @@ class Base64ImageField(serializers.ImageField):
         extension = "jpg" if extension == "jpeg" else extension
 
         return extension
+
+
+class RecipeImageField(Base64ImageField):
+    """Отдаёт вариант фотографии рецепта, подходящий контексту.
+
+    Вариант берётся из ``image_rendition`` в контексте сериализатора
+    (``thumbnail``, ``card`` или ``large``). Пока варианты новой
+    фотографии не сгенерированы, возвращается оригинал.
+    """
+
+    def __init__(self, *args, image_format="jpeg", **kwargs):
+        self.image_format = image_format
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        renditions = getattr(value.instance, "image_renditions", None) or {}
+        if renditions.get("source") != value.name:
+            # Варианты прежней фотографии: новые ещё не готовы.
+            renditions = {}
+        rendition = renditions.get(self.context.get("image_rendition"), {})
+        path = rendition.get(self.image_format)
+        if path is None:
+            return super().to_representation(value)
+        url = value.storage.url(path)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -1,6 +1,33 @@
 import django_filters as filters
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe
+from recipes import fulltext
+from recipes.models import Ingredient, Recipe, Tag
+
+from .cache import get_versions
+
+TAG_MAP_KEY = "tag_slug_map:{}"
+
+
+def get_tag_map():
+    """Словарь slug -> id тегов, закэшированный до изменения тегов.
+
+    Таймаут ограничивает жизнь словаря, если запись в обход сигналов не
+    сдвинула версию тегов.
+    """
+    key = TAG_MAP_KEY.format(*get_versions(("tag",)))
+    return cache.get_or_set(
+        key,
+        lambda: dict(Tag.objects.values_list("slug", "id")),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
 
 
 class IngredientFilter(filters.FilterSet):
@@ -18,8 +45,9 @@ class IngredientFilter(filters.FilterSet):
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name="tags__slug", conjoined=False
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method="get_tags",
     )
     is_favorited = filters.BooleanFilter(
         method="get_is_favorited",
@@ -27,6 +55,22 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method="get_is_in_shopping_cart",
     )
+    search = filters.CharFilter(
+        method="get_search",
+    )
+
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_map = get_tag_map()
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef("pk"),
+                    tag_id__in=[tag_map[slug] for slug in value],
+                )
+            )
+        )
 
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -38,6 +82,16 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        # Курсор сортирует по id и отбросил бы сортировку по релевантности.
+        if "cursor" in self.request.query_params:
+            raise ValidationError(
+                {"search": "Поиск не поддерживает пагинацию курсором"}
+            )
+        return fulltext.search(queryset, value)
+
     class Meta:
         model = Recipe
         fields = (
@@ -45,4 +99,5 @@ class RecipeFilter(filters.FilterSet):
             "tags",
             "is_favorited",
             "is_in_shopping_cart",
+            "search",
         )
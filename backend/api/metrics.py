@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    "foodgram_request_duration_seconds": (
+        "Полное время обработки запроса",
+        DURATION_BUCKETS,
+    ),
+    "foodgram_request_db_seconds": (
+        "Время SQL-запросов за запрос",
+        DURATION_BUCKETS,
+    ),
+    "foodgram_request_app_seconds": (
+        "Время кода представления без SQL (в основном сериализация)",
+        DURATION_BUCKETS,
+    ),
+    "foodgram_request_render_seconds": (
+        "Время рендеринга ответа",
+        DURATION_BUCKETS,
+    ),
+    "foodgram_request_queries": (
+        "Количество SQL-запросов за запрос",
+        QUERY_BUCKETS,
+    ),
+}
+
+COUNTERS = {
+    "foodgram_db_connections_opened_total": "Открыто соединений с БД",
+    "foodgram_db_connections_reused_total": (
+        "HTTP-запросов, получивших уже открытое соединение"
+    ),
+    "foodgram_db_health_check_failures_total": (
+        "Оборванных соединений, найденных проверкой перед запросом"
+    ),
+}
+
+FLUSH_INTERVAL = 1.0
+
+
+class MetricsRegistry:
+    """Гистограммы по маршрутам и счётчики в памяти воркера.
+
+    Если задан ``METRICS_DIR``, каждый воркер периодически сбрасывает свои
+    значения в отдельный файл ``<pid>.json``, а эндпоинт метрик суммирует
+    все файлы каталога — так данные gunicorn-воркеров собираются вместе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._last_flush = 0.0
+
+    @property
+    def directory(self):
+        return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = json.dumps([name, sorted(labels.items())])
+        with self._lock:
+            counts = self._values.setdefault(key, [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def increment(self, name, labels, amount=1):
+        key = json.dumps([name, sorted(labels.items())])
+        with self._lock:
+            counts = self._values.setdefault(key, [0])
+            counts[0] += amount
+
+    def maybe_flush(self, force=False):
+        directory = self.directory
+        if directory is None or not self._values:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        with self._lock:
+            payload = json.dumps(self._values)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / "{}.json".format(os.getpid())
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        directory = self.directory
+        if directory is None:
+            with self._lock:
+                return {
+                    key: list(counts) for key, counts in self._values.items()
+                }
+        self.maybe_flush(force=True)
+        merged = {}
+        for path in directory.glob("*.json"):
+            try:
+                values = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for key, counts in values.items():
+                total = merged.setdefault(key, [0] * len(counts))
+                for index, count in enumerate(counts):
+                    total[index] += count
+        return merged
+
+    def render(self):
+        series = {}
+        for key, counts in self.collect().items():
+            name, labels = json.loads(key)
+            series.setdefault(name, []).append((labels, counts))
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} histogram".format(name))
+            for labels, counts in sorted(series.get(name, [])):
+                label_text = ",".join(
+                    '{}="{}"'.format(key, value) for key, value in labels
+                )
+                bounds = [str(bound) for bound in buckets] + ["+Inf"]
+                for bound, count in zip(bounds, counts[:-2] + counts[-1:]):
+                    lines.append(
+                        '{}_bucket{{{},le="{}"}} {}'.format(
+                            name, label_text, bound, count
+                        )
+                    )
+                lines.append(
+                    "{}_sum{{{}}} {}".format(name, label_text, counts[-2])
+                )
+                lines.append(
+                    "{}_count{{{}}} {}".format(name, label_text, counts[-1])
+                )
+        for name, help_text in COUNTERS.items():
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} counter".format(name))
+            for labels, counts in sorted(series.get(name, [])):
+                label_text = ",".join(
+                    '{}="{}"'.format(key, value) for key, value in labels
+                )
+                lines.append("{}{{{}}} {}".format(name, label_text, counts[0]))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from contextvars import ContextVar
+
+from . import replicas
+from .metrics import registry
+
+current_timer = ContextVar("current_timer", default=None)
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def time_query(execute, sql, params, many, context):
+    """Обёртка выполнения SQL, которую получает каждое соединение с БД.
+
+    Таймер берётся из контекстной переменной, а не из соединения: под ASGI
+    запросы к БД идут в других потоках, куда asgiref копирует контекст.
+    """
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.duration += time.perf_counter() - started
+        timer.count += 1
+
+
+class ServerTimingMiddleware:
+    """Замеряет SQL, код представления и рендеринг каждого запроса.
+
+    Результат отдаётся в заголовке ``Server-Timing`` и копится в
+    гистограммах по имени маршрута (``recipes-list``, ``subscriptions``).
+    Время ``app`` — код представления без SQL; DRF вычисляет
+    сериализаторы внутри представления, так что это время сериализации.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django 3.2 узнаёт асинхронное промежуточное ПО.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response)
+
+    def start(self, request):
+        timer = QueryTimer()
+        marks = {"started": time.perf_counter(), "view_db": 0.0}
+        request._server_timing = (timer, marks)
+        return current_timer.set(timer)
+
+    def finish(self, request, response):
+        timer, marks = request._server_timing
+        finished = time.perf_counter()
+        if "render_started" not in marks:
+            marks["view_db"] += timer.duration
+
+        view_finished = marks.get("render_started", finished)
+        render = marks.get("render_finished", view_finished) - view_finished
+        app = view_finished - marks.get("view_started", marks["started"])
+        app = max(app - marks["view_db"], 0.0)
+        total = finished - marks["started"]
+        response["Server-Timing"] = ", ".join(
+            (
+                'db;dur={:.2f};desc="{} queries"'.format(
+                    timer.duration * 1000, timer.count
+                ),
+                "app;dur={:.2f}".format(app * 1000),
+                "render;dur={:.2f}".format(render * 1000),
+                "total;dur={:.2f}".format(total * 1000),
+            )
+        )
+
+        match = request.resolver_match
+        labels = {
+            "route": match.url_name if match else "unmatched",
+            "method": request.method,
+        }
+        registry.observe("foodgram_request_duration_seconds", labels, total)
+        registry.observe("foodgram_request_db_seconds", labels, timer.duration)
+        registry.observe("foodgram_request_app_seconds", labels, app)
+        registry.observe("foodgram_request_render_seconds", labels, render)
+        registry.observe("foodgram_request_queries", labels, timer.count)
+        registry.maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer, marks = request._server_timing
+        marks["view_started"] = time.perf_counter()
+        marks["view_db"] = -timer.duration
+
+    def process_template_response(self, request, response):
+        timer, marks = request._server_timing
+        marks["render_started"] = time.perf_counter()
+        marks["view_db"] += timer.duration
+
+        def finish(response):
+            marks["render_finished"] = time.perf_counter()
+
+        response.add_post_render_callback(finish)
+        return response
+
+
+class PrimaryStickinessMiddleware:
+    """Ведёт состояние запроса для ``ReplicaRouter``.
+
+    Если за запрос была запись в БД, пользователь на
+    ``DB_REPLICA_STICKY_SECONDS`` читает только из основной базы и видит
+    свои изменения, даже пока реплика отстаёт.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = replicas.start_request()
+        try:
+            return self.get_response(request)
+        finally:
+            replicas.finish_request(request, token)
+
+    async def __acall__(self, request):
+        token = replicas.start_request()
+        try:
+            return await self.get_response(request)
+        finally:
+            replicas.finish_request(request, token)
@@ -1,6 +1,65 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# Позиции курсоров — id рецептов, то есть bigint.
+MAX_POSITION = 2 ** 63 - 1
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "-id"
+
+    def decode_cursor(self, request):
+        """Курсор с позицией, которая не может быть id, — такой же
+        недействительный, как и неразобранный, а не ошибка 500 в запросе."""
+        cursor = super().decode_cursor(request)
+        if cursor is not None and cursor.position is not None:
+            try:
+                position = int(cursor.position)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if abs(position) > MAX_POSITION:
+                raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+class FeedCursorPagination(CustomCursorPagination):
+    ordering = "-feed_position"
+
+
+class CursorOrPageNumberPagination(CustomPageNumberPagination):
+    """Постраничная пагинация с опциональным режимом курсора.
+
+    Клиенты, передающие параметр ``cursor`` (в том числе пустой для первой
+    страницы), получают keyset-пагинацию по ``id`` без ``COUNT(*)`` и
+    ``OFFSET``. Остальные запросы обслуживаются как раньше.
+    """
+
+    cursor_query_param = "cursor"
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response_schema(schema)
+        return super().get_paginated_response_schema(schema)
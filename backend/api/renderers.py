@@ -0,0 +1,89 @@
+import csv
+import json
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` на orjson с тем же выводом байт в байт.
+
+    Компактный вывод UTF-8 у них совпадает; даты, Decimal, ленивые строки
+    и прочее orjson передаёт кодировщику DRF, а U+2028/U+2029
+    экранируются так же, как в ``JSONRenderer``. Расходиться может только
+    запись float в экспоненциальной форме — в API таких чисел нет. Отступы
+    (``indent`` в Accept), ``UNICODE_JSON=False`` и ``STRICT_JSON=False``
+    обслуживает обычный рендерер.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent or self.ensure_ascii or not self.strict or not self.compact:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(data, default=self.default, option=self.options)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = "\n".join(
+                "{}: {}".format(key, value) for key, value in data.items()
+            )
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+SHOPPING_LIST_RENDERERS = (PlainTextRenderer, CSVRenderer, JSONRenderer)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_shopping_list(rows, format):
+    """Построчно отдаёт агрегированный список покупок в нужном формате.
+
+    ``rows`` — словари с ключами ``name``, ``measurement_unit`` и
+    ``amount``.
+    """
+    if format == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(("name", "amount", "measurement_unit"))
+        for row in rows:
+            yield writer.writerow(
+                (row["name"], row["amount"], row["measurement_unit"])
+            )
+    elif format == "json":
+        separator = "["
+        for row in rows:
+            yield separator + json.dumps(row, ensure_ascii=False)
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+    else:
+        for row in rows:
+            yield "{} ({}) — {}\n".format(
+                row["name"], row["measurement_unit"], row["amount"]
+            )
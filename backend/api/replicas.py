@@ -0,0 +1,125 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import USER_LISTS_VERSION, recently_changed
+
+STICKY_KEY = "db_primary_until:{}"
+# Сколько секунд не пробовать реплику, к которой не удалось подключиться.
+REPLICA_RETRY_SECONDS = 30
+
+# Недоступные реплики этого процесса: алиас -> время следующей попытки.
+_down_until = {}
+
+# Состояние текущего HTTP-запроса: выбранная реплика и были ли записи.
+request_state = ContextVar("db_request_state", default=None)
+
+
+class ReplicaRouter:
+    """Отправляет чтение на реплику, если представление это разрешило.
+
+    Реплика выбирается только в ``ReplicaReadMixin`` для безопасных
+    методов; всё остальное — записи, команды, чтения после записи в том
+    же запросе — идёт в ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if state is None or state["wrote"]:
+            return None
+        return state["replica"]
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема на реплики приходит репликацией с основной базы.
+        return db == DEFAULT_DB_ALIAS
+
+
+def start_request():
+    return request_state.set({"replica": None, "wrote": False})
+
+
+def finish_request(request, token):
+    """Закрепляет пользователя за основной базой после его записи."""
+    state = request_state.get()
+    request_state.reset(token)
+    user = getattr(request, "user", None)
+    if state["wrote"] and user is not None and user.is_authenticated:
+        window = settings.DB_REPLICA_STICKY_SECONDS
+        cache.set(STICKY_KEY.format(user.pk), time.time() + window, window)
+
+
+def is_sticky(user):
+    if not user.is_authenticated:
+        return False
+    until = cache.get(STICKY_KEY.format(user.pk))
+    return until is not None and until > time.time()
+
+
+def choose_replica():
+    """Случайная доступная реплика или ``None``, если все недоступны.
+
+    Реплика, к которой не удалось подключиться, на
+    ``REPLICA_RETRY_SECONDS`` выпадает из выбора, и чтение идёт в основную
+    базу.
+    """
+    now = time.monotonic()
+    aliases = [
+        alias
+        for alias in settings.REPLICA_DATABASES
+        if _down_until.get(alias, 0) <= now
+    ]
+    random.shuffle(aliases)
+    for alias in aliases:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            _down_until[alias] = now + REPLICA_RETRY_SECONDS
+        else:
+            return alias
+    return None
+
+
+class ReplicaReadMixin:
+    """Читает с реплики в GET-запросах, если пользователь недавно не писал.
+
+    Выбор делается после аутентификации, чтобы знать пользователя; запрос
+    токена при промахе кэша идёт в основную базу. Ответы кэшируются и
+    получают ETag под текущими версиями ``cache_dependencies``, поэтому,
+    пока версии недавно сдвинулись и реплика может отставать, чтение тоже
+    идёт в основную базу: иначе старые строки попали бы в кэш под новой
+    версией.
+    """
+
+    cache_dependencies = ()
+
+    def get_replica_dependencies(self, request):
+        names = list(self.cache_dependencies)
+        if request.user.is_authenticated:
+            names.append(USER_LISTS_VERSION.format(request.user.pk))
+        return names
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = request_state.get()
+        if (
+            state is not None
+            and settings.REPLICA_DATABASES
+            and request.method in SAFE_METHODS
+            and not is_sticky(request.user)
+            and not recently_changed(self.get_replica_dependencies(request))
+        ):
+            state["replica"] = choose_replica()
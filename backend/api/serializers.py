@@ -1,14 +1,16 @@
 from django.contrib.auth import get_user_model
-from django.db.models import F
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from recipes import fulltext, shopping_list
 from recipes.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.signals import bulk_changed
 from users.models import Follow
 
-from .fields import Base64ImageField
+from .fields import Base64ImageField, RecipeImageField
 
 User = get_user_model()
 
@@ -28,6 +30,8 @@ class MyUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context.get("request").user
         return (
             user.is_authenticated
@@ -65,7 +69,10 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeSimpleSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_webp = RecipeImageField(
+        source="image", image_format="webp", read_only=True
+    )
 
     class Meta:
         model = Recipe
@@ -73,6 +80,7 @@ class RecipeSimpleSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_webp",
             "cooking_time",
         )
 
@@ -81,12 +89,15 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
     id = serializers.ReadOnlyField(source="recipe.id")
     name = serializers.ReadOnlyField(source="recipe.name")
-    image = Base64ImageField(source="recipe.image", read_only=True)
+    image = RecipeImageField(source="recipe.image", read_only=True)
+    image_webp = RecipeImageField(
+        source="recipe.image", image_format="webp", read_only=True
+    )
     cooking_time = serializers.ReadOnlyField(source="recipe.cooking_time")
 
     class Meta:
         model = Favorite
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_webp", "cooking_time")
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
@@ -94,7 +105,10 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="recipe.id")
     name = serializers.ReadOnlyField(source="recipe.name")
     cooking_time = serializers.ReadOnlyField(source="recipe.cooking_time")
-    image = Base64ImageField(read_only=True, source="recipe.image")
+    image = RecipeImageField(read_only=True, source="recipe.image")
+    image_webp = RecipeImageField(
+        source="recipe.image", image_format="webp", read_only=True
+    )
 
     class Meta:
         model = ShoppingCart
@@ -103,6 +117,7 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
             "name",
             "cooking_time",
             "image",
+            "image_webp",
         )
 
 
@@ -125,18 +140,45 @@ class FolllowSerializer(serializers.ModelSerializer):
         model = User
 
     def get_recipes(self, obj):
-        return RecipeSimpleSerializer(obj.recipe.all(), many=True).data
+        context = dict(self.context, image_rendition="thumbnail")
+        return RecipeSimpleSerializer(
+            obj.recipe.all(), many=True, context=context
+        ).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj).count()
 
     def get_is_subscribed(self, author):
+        if hasattr(author, "is_subscribed"):
+            return author.is_subscribed
         user = self.context["request"].user
         return Follow.objects.filter(
             author__id=author.id, user__id=user.id
         ).exists()
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_recipes(self, data):
+        return list(dict.fromkeys(data))
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
 class SubscribeSerializer(serializers.ModelSerializer):
     queryset = User.objects.all()
     user = serializers.PrimaryKeyRelatedField(queryset=queryset)
@@ -172,7 +214,10 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_webp = RecipeImageField(
+        source="image", image_format="webp", read_only=True
+    )
 
     class Meta:
         model = Recipe
@@ -185,16 +230,21 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_webp",
             "text",
             "cooking_time",
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         return Favorite.objects.filter(
             user=self.context["request"].user.id, recipe=obj.id
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         return ShoppingCart.objects.filter(
             user=self.context["request"].user.id, recipe=obj.id
         ).exists()
@@ -213,9 +263,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     image = Base64ImageField(use_url=True)
     ingredients = IngridientInRecipeCreateSerializer(many=True)
     author = MyUserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     cooking_time = serializers.IntegerField()
 
     class Meta:
@@ -232,20 +280,31 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
     def validate_ingredients(self, data):
-        ingredients = self.initial_data.get("ingredients")
-        ingredients_set = set()
-        if not ingredients:
+        if not data:
             raise serializers.ValidationError(
                 "Вы не добавили не одного ингредиента"
             )
-        for ingredient in ingredients:
-            if int(ingredient["amount"]) < 1:
+        amounts = {}
+        for ingredient in data:
+            if ingredient["amount"] < 1:
                 raise serializers.ValidationError(
                     "Колличество ингредиентов должно быть больше нуля"
                 )
-            id = ingredient.get("id")
-            ingredients_set.add(id)
-        return data
+            id = ingredient["id"]
+            amounts[id] = amounts.get(id, 0) + ingredient["amount"]
+        existing = set(
+            Ingredient.objects.filter(id__in=amounts).values_list(
+                "id", flat=True
+            )
+        )
+        missing = sorted(set(amounts) - existing)
+        if missing:
+            raise serializers.ValidationError(
+                "Ингредиенты не найдены: {}".format(
+                    ", ".join(map(str, missing))
+                )
+            )
+        return [{"id": id, "amount": amount} for id, amount in amounts.items()]
 
     def validate_tags(self, data):
         tags_set = set()
@@ -257,6 +316,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     "Вы указали два одинаковых тэга"
                 )
             tags_set.add(tag)
+        existing = set(
+            Tag.objects.filter(id__in=tags_set).values_list("id", flat=True)
+        )
+        missing = sorted(tags_set - existing)
+        if missing:
+            raise serializers.ValidationError(
+                "Теги не найдены: {}".format(", ".join(map(str, missing)))
+            )
         return data
 
     def validate_cooking_time(self, data):
@@ -267,17 +334,17 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return data
 
     def create_ingridients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            instance = get_object_or_404(Ingredient, id=ingredient["id"])
-            amount = ingredient["amount"]
-            if IngridientInRecipe.objects.filter(
-                recipe=recipe, ingredient=instance
-            ).exists():
-                amount += F("amount")
-            IngridientInRecipe.objects.update_or_create(
-                recipe=recipe, ingredient=instance, defaults={"amount": amount}
+        IngridientInRecipe.objects.bulk_create(
+            IngridientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient["id"],
+                amount=ingredient["amount"],
             )
+            for ingredient in ingredients
+        )
+        bulk_changed.send(sender=IngridientInRecipe, recipe_ids=[recipe.id])
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
@@ -285,24 +352,41 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingridients(ingredients, recipe)
+        fulltext.update_index([recipe.id])
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
 
         if "ingredients" in self.initial_data:
+            old_amounts = shopping_list.recipe_amounts(instance.id)
             instance.ingredients.clear()
             self.create_ingridients(ingredients, instance)
+            deltas = shopping_list.recipe_amounts(instance.id)
+            deltas.subtract(old_amounts)
+            shopping_list.change_recipe_totals(instance.id, deltas)
 
         if "tags" in self.initial_data:
             instance.tags.set(tags)
 
         super().update(instance, validated_data)
+        fulltext.update_index([instance.id])
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            "tags",
+            Prefetch(
+                "ingridient_in_recipe",
+                queryset=IngridientInRecipe.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
         data = RecipeGetSerializer(
             instance, context={"request": self.context.get("request")}
         ).data
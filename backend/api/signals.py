@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.signals import author_changed, bulk_changed, in_bulk_lists
+from users.models import Follow
+
+from . import db
+from .authentication import token_cache
+from .cache import USER_LISTS_VERSION, bump_version
+from .middleware import time_query
+
+User = get_user_model()
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@receiver(connection_created)
+def count_opened_connection(sender, connection, **kwargs):
+    db.count_opened_connection(connection)
+
+
+@receiver(request_started)
+def check_db_connections(sender, **kwargs):
+    db.check_connections()
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    token_cache.revoke_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def revoke_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        token_cache.revoke_user(instance.pk)
+
+
+@receiver([post_save, post_delete, bulk_changed], sender=Recipe)
+@receiver([post_save, post_delete, bulk_changed], sender=IngridientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version(sender, **kwargs):
+    bump_version("recipe")
+
+
+@receiver([post_save, post_delete, bulk_changed], sender=Tag)
+def bump_tag_version(sender, **kwargs):
+    bump_version("tag")
+
+
+@receiver([post_save, post_delete, bulk_changed], sender=Ingredient)
+def bump_ingredient_version(sender, **kwargs):
+    bump_version("ingredient")
+
+
+@receiver(post_save, sender=User)
+def bump_author_version(sender, instance, created, update_fields, **kwargs):
+    if author_changed(instance, created, update_fields):
+        bump_version("user")
+
+
+@receiver([post_delete, bulk_changed], sender=User)
+def bump_user_version(sender, **kwargs):
+    bump_version("user")
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=Follow)
+def bump_user_lists_version(sender, instance, **kwargs):
+    if in_bulk_lists():
+        return
+    bump_version(USER_LISTS_VERSION.format(instance.user_id))
+
+
+@receiver(bulk_changed, sender=ShoppingListItem)
+def bump_shopping_lists_version(sender, user_ids, **kwargs):
+    for user_id in user_ids:
+        bump_version(USER_LISTS_VERSION.format(user_id))
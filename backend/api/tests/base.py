@@ -0,0 +1,114 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngridientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+
+def image_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 10, 10)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def image_data():
+    return "data:image/png;base64," + base64.b64encode(image_bytes()).decode()
+
+
+class FoodgramTestCase(TestCase):
+    """Пользователи, теги и ингредиенты для тестов API; картинки рецептов
+    пишутся во временный MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f"user{number}",
+                email=f"user{number}@example.com",
+                password="secret-password-1",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for number in range(3)
+        ]
+        cls.user = cls.users[0]
+        cls.tags = [
+            Tag.objects.create(
+                name=f"Тег {number}", slug=f"tag{number}", color="#00FF00"
+            )
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(100)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.authorized = self.client_for(self.user)
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+        return client
+
+    def recipe_payload(self, ingredients=1, **fields):
+        payload = {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 10}
+                for ingredient in self.ingredients[:ingredients]
+            ],
+            "tags": [self.tags[0].id],
+            "image": image_data(),
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 5,
+        }
+        payload.update(fields)
+        return payload
+
+    def create_recipe(self, author=None, ingredients=3, tags=1):
+        """Рецепт напрямую через ORM, минуя API."""
+        recipe = Recipe(
+            author=author or self.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=5,
+        )
+        recipe.image.save("test.png", ContentFile(image_bytes()), save=False)
+        recipe.save()
+        recipe.tags.set(self.tags[:tags])
+        IngridientInRecipe.objects.bulk_create(
+            IngridientInRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in self.ingredients[:ingredients]
+        )
+        return recipe
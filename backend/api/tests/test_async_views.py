@@ -0,0 +1,125 @@
+import importlib
+import shutil
+import tempfile
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+from api import urls
+from api.authentication import token_cache
+from recipes.models import Favorite, Recipe
+from users.models import Follow
+
+from .base import image_bytes
+
+User = get_user_model()
+
+
+class AsyncToggleTests(TransactionTestCase):
+    """Маршруты ``api.async_views``, которые включает ``ASYNC_VIEWS``.
+
+    Работа с БД идёт в пуле потоков со своими соединениями, поэтому тест
+    транзакционный: данные должны быть закоммичены.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.async_views = override_settings(
+            ASYNC_VIEWS=True, MEDIA_ROOT=cls.media_root
+        )
+        cls.async_views.enable()
+        cls.reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.async_views.disable()
+        cls.reload_urls()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def reload_urls():
+        # Маршруты выбираются при импорте api.urls; корневой urls.py тоже
+        # перезагружается, чтобы include() увидел новый список.
+        importlib.reload(urls)
+        importlib.reload(import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user, self.author = (
+            User.objects.create_user(
+                username=name,
+                email=f"{name}@example.com",
+                password="secret-password-1",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for name in ("user", "author")
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe(
+            author=self.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=5,
+        )
+        self.recipe.image.save("test.png", ContentFile(image_bytes()))
+        self.url = f"/api/recipes/{self.recipe.id}/favorite/"
+
+    async def send(self, method, path, key=None):
+        # AsyncClient в Django 3.2 превращает в заголовки только
+        # именованные аргументы запроса, а не ключи HTTP_*.
+        headers = {"authorization": f"Token {key}"} if key else {}
+        return await getattr(AsyncClient(), method)(path, **headers)
+
+    async def test_token_user_toggles_favorite(self):
+        key = self.token.key
+        response = await self.send("get", self.url, key)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["id"], self.recipe.id)
+        response = await self.send("get", self.url, key)
+        self.assertEqual(response.status_code, 400)
+        response = await self.send("delete", self.url, key)
+        self.assertEqual(response.status_code, 204)
+        exists = sync_to_async(Favorite.objects.filter(user=self.user).exists)
+        self.assertFalse(await exists())
+
+    async def test_token_user_subscribes(self):
+        response = await self.send(
+            "get", f"/api/users/{self.author.id}/subscribe/", self.token.key
+        )
+        self.assertEqual(response.status_code, 201)
+        count = sync_to_async(Follow.objects.filter(user=self.user).count)
+        self.assertEqual(await count(), 1)
+
+    async def test_anonymous_gets_401(self):
+        for method in ("get", "delete"):
+            with self.subTest(method=method):
+                response = await self.send(method, self.url)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response["WWW-Authenticate"], "Token")
+
+    async def test_invalid_and_revoked_tokens_get_401(self):
+        response = await self.send("get", self.url, "invalid")
+        self.assertEqual(response.status_code, 401)
+        response = await self.send("get", self.url, self.token.key)
+        self.assertEqual(response.status_code, 201)
+        await sync_to_async(self.token.delete)()
+        response = await self.send("delete", self.url, self.token.key)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_other_methods_are_not_allowed(self):
+        response = await self.send("post", self.url, self.token.key)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response["Allow"], "GET, DELETE")
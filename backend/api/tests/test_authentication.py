@@ -0,0 +1,32 @@
+from rest_framework.authtoken.models import Token
+
+from api.authentication import LOCAL_CACHE_TTL, TokenUserCache, token_cache
+
+from .base import FoodgramTestCase
+
+
+class TokenUserCacheTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.token = Token.objects.get(user=self.user)
+
+    def test_each_request_gets_its_own_user(self):
+        cache = TokenUserCache(maxsize=10, ttl=60)
+        cache.set(self.token.key, (self.user, self.token))
+        first, _ = cache.get(self.token.key)
+        first.first_name = "Изменено"
+        second, _ = cache.get(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, "Имя")
+
+    def test_logout_revokes_cached_token(self):
+        response = self.authorized.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+        response = self.authorized.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        response = self.authorized.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_local_cache_caps_ttl(self):
+        self.assertLessEqual(token_cache.ttl, LOCAL_CACHE_TTL)
@@ -0,0 +1,78 @@
+from django.test import override_settings
+
+from recipes import feed
+from recipes.models import FeedEntry
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+@override_settings(FEED_FANOUT_FOLLOWING=2)
+class FeedTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.authors = self.users[1:]
+        self.recipes = {
+            author.id: self.create_recipe(author=author)
+            for author in self.authors
+        }
+
+    def follow(self, author):
+        Follow.objects.create(user=self.user, author=author)
+
+    def stored(self):
+        return set(
+            FeedEntry.objects.filter(user=self.user).values_list(
+                "recipe_id", flat=True
+            )
+        )
+
+    def feed_ids(self):
+        response = self.authorized.get("/api/recipes/feed/")
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_below_threshold_feed_is_merged(self):
+        self.follow(self.authors[0])
+        self.assertEqual(self.stored(), set())
+        self.assertEqual(
+            self.feed_ids(), [self.recipes[self.authors[0].id].id]
+        )
+
+    def test_above_threshold_feed_is_stored(self):
+        for author in self.authors:
+            self.follow(author)
+        self.assertEqual(
+            self.stored(), {recipe.id for recipe in self.recipes.values()}
+        )
+        new = self.create_recipe(author=self.authors[0])
+        self.assertIn(new.id, self.stored())
+        self.assertEqual(self.feed_ids()[0], new.id)
+
+    def test_threshold_does_not_depend_on_counter_receiver(self):
+        # Без сигналов счётчик подписок в UserStats не изменится.
+        Follow.objects.bulk_create(
+            Follow(user=self.user, author=author) for author in self.authors
+        )
+        feed.follow(self.user.id, self.authors[-1].id)
+        self.assertEqual(len(self.stored()), len(self.authors))
+
+    @override_settings(FEED_FANOUT_FOLLOWING=1)
+    def test_unfollow_prunes_author(self):
+        for author in self.authors:
+            self.follow(author)
+        Follow.objects.get(user=self.user, author=self.authors[1]).delete()
+        self.assertEqual(self.stored(), {self.recipes[self.authors[0].id].id})
+        Follow.objects.get(user=self.user, author=self.authors[0]).delete()
+        self.assertEqual(self.stored(), set())
+
+    def test_rebuild_follows_threshold(self):
+        for author in self.authors:
+            self.follow(author)
+        with override_settings(FEED_FANOUT_FOLLOWING=3):
+            self.assertEqual(feed.rebuild(), 0)
+        self.assertEqual(self.stored(), set())
+        self.assertEqual(feed.rebuild(), 1)
+        self.assertEqual(
+            self.stored(), {recipe.id for recipe in self.recipes.values()}
+        )
@@ -0,0 +1,16 @@
+from recipes.management.commands.generate_data import Command
+from recipes.models import Tag
+
+from .base import FoodgramTestCase
+
+
+class GenerateDataTests(FoodgramTestCase):
+    def test_created_tags_are_filterable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.all().delete()
+        response = self.anonymous.get("/api/recipes/", {"tags": "breakfast"})
+        self.assertEqual(response.status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            Command().create_tags()
+        response = self.anonymous.get("/api/recipes/", {"tags": "breakfast"})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,46 @@
+import io
+
+from django.core.management import call_command
+
+from recipes.models import Recipe
+
+from .base import FoodgramTestCase
+
+
+class RecipeImageRenditionsTests(FoodgramTestCase):
+    def create(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.authorized.post(
+                "/api/recipes/", self.recipe_payload(), format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data["id"]), callbacks
+
+    def test_renditions_are_rendered_after_commit(self):
+        recipe, callbacks = self.create()
+        self.assertEqual(recipe.image_renditions, {})
+        for callback in callbacks:
+            callback()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_renditions["source"], recipe.image.name)
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertIn("_large.jpg", response.data["image"])
+        self.assertIn("_large.webp", response.data["image_webp"])
+
+    def test_original_is_served_until_renditions_are_ready(self):
+        recipe, callbacks = self.create()
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertTrue(response.data["image"].endswith(recipe.image.name))
+        self.assertEqual(response.data["image_webp"], response.data["image"])
+
+    def test_command_invalidates_cached_responses(self):
+        recipe = self.create_recipe()
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertTrue(response.data["image"].endswith(recipe.image.name))
+        updated_at = recipe.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("generate_renditions", stdout=io.StringIO())
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertIn("_large.jpg", response.data["image"])
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from recipes.models import Ingredient
+from recipes.search import IngredientIndex, ingredient_index
+
+from .base import FoodgramTestCase
+
+
+class IngredientSearchTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ("молоко", "сгущённое молоко", "мука", "мёд", "сахар"):
+            Ingredient.objects.create(name=name, measurement_unit="г")
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient_index.invalidate()
+
+    def search(self, query):
+        response = self.anonymous.get("/api/ingredients/", {"name": query})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient["name"] for ingredient in response.data]
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(self.search("мо")[:2], ["молоко", "сгущённое молоко"])
+
+    def test_wrong_keyboard_layout(self):
+        self.assertEqual(self.search("vjkjrj")[0], "молоко")
+
+    def test_typo(self):
+        self.assertIn("сахар", self.search("сахр"))
+
+    def test_new_ingredient_is_found(self):
+        self.search("молоч")
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="молочай", measurement_unit="г")
+        self.assertIn("молочай", self.search("молоч"))
+
+    def test_index_waits_for_commit(self):
+        self.search("молоч")
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="молочай", measurement_unit="г")
+            self.assertNotIn("молочай", self.search("молоч"))
+        self.assertIn("молочай", self.search("молоч"))
+
+    @mock.patch("recipes.search.CHECK_INTERVAL", 0)
+    def test_rows_added_by_another_process_are_found(self):
+        # bulk_create без сигнала — как load_data в отдельном процессе с
+        # локальным кэшем, где версия индекса не меняется.
+        self.search("молоч")
+        Ingredient.objects.bulk_create(
+            [Ingredient(name="молочай", measurement_unit="г")]
+        )
+        self.assertIn("молочай", self.search("молоч"))
+
+    def test_search_keeps_the_snapshot_it_started_with(self):
+        index = IngredientIndex()
+        snapshot = index._ensure_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="маскарпоне", measurement_unit="г")
+            index.invalidate()
+        self.assertNotIn(
+            "маскарпоне", [entry["name"] for entry in snapshot.entries]
+        )
+        self.assertIsNot(index._ensure_fresh(), snapshot)
+        self.assertEqual(index.search("маскарпоне")[0]["name"], "маскарпоне")
@@ -0,0 +1,51 @@
+import io
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+
+from recipes.models import Ingredient
+
+from .base import FoodgramTestCase
+
+
+class LoadDataTests(FoodgramTestCase):
+    def load(self, rows, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "ingredients.csv"
+            path.write_text(
+                "".join(f"{name},{unit}\n" for name, unit in rows),
+                encoding="utf-8",
+            )
+            output = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("load_data", str(path), *args, stdout=output)
+        return output.getvalue()
+
+    def test_update_changes_recipes_using_ingredient(self):
+        recipe = self.create_recipe(ingredients=1)
+        other = self.create_recipe(author=self.users[1], ingredients=0)
+        # Теги рецептов сдвигают updated_at в базе после save().
+        recipe.refresh_from_db()
+        other.refresh_from_db()
+        updated = {recipe.id: recipe.updated_at, other.id: other.updated_at}
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(
+            response.data["ingredients"][0]["measurement_unit"], "г"
+        )
+        output = self.load(
+            [("Ингредиент 0", "кг"), ("Новый", "шт")],
+            "--update",
+            "--batch-size",
+            "1",
+        )
+        self.assertIn("Пакет 2: 1 строк", output)
+        self.assertTrue(Ingredient.objects.filter(name="Новый").exists())
+        recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated[recipe.id])
+        self.assertEqual(other.updated_at, updated[other.id])
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(
+            response.data["ingredients"][0]["measurement_unit"], "кг"
+        )
@@ -0,0 +1,58 @@
+import base64
+from urllib.parse import urlencode
+
+from .base import FoodgramTestCase
+
+
+def encode_cursor(**params):
+    return base64.b64encode(urlencode(params).encode()).decode()
+
+
+class CursorPaginationTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = [self.create_recipe().id for _ in range(5)]
+
+    def page(self, url, params=None):
+        response = self.authorized.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_inserts_between_pages_do_not_shift_pages(self):
+        data = self.page("/api/recipes/", {"cursor": "", "limit": 2})
+        seen = [recipe["id"] for recipe in data["results"]]
+        while data["next"]:
+            self.create_recipe()
+            data = self.page(data["next"])
+            seen += [recipe["id"] for recipe in data["results"]]
+        # Новые рецепты выше курсора: без пропусков и повторов старых.
+        self.assertEqual(seen, sorted(self.ids, reverse=True))
+        data = self.page("/api/recipes/", {"cursor": "", "limit": 2})
+        self.assertGreater(data["results"][0]["id"], max(self.ids))
+
+    def test_invalid_cursors_are_not_found(self):
+        for cursor in (
+            "garbage",
+            encode_cursor(p="abc"),
+            encode_cursor(p="9" * 30),
+            encode_cursor(o="-1"),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.authorized.get(
+                    "/api/recipes/", {"cursor": cursor}
+                )
+                self.assertEqual(response.status_code, 404)
+        response = self.authorized.get(
+            "/api/recipes/feed/", {"cursor": encode_cursor(p="abc")}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_edited_numeric_position_pages_from_it(self):
+        response = self.authorized.get(
+            "/api/recipes/", {"cursor": encode_cursor(p=self.ids[2])}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]],
+            sorted(self.ids[:2], reverse=True),
+        )
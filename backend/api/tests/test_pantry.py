@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.db import DatabaseError
+
+from recipes import pantry
+from recipes.models import IngridientInRecipe
+from recipes.pantry import PantryIndex, pantry_index
+
+from .base import FoodgramTestCase
+
+
+class PantryTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        pantry_index.invalidate()
+        self.full = self.create_recipe(ingredients=2)
+        self.half = self.create_recipe(ingredients=4)
+        self.pantry = [ingredient.id for ingredient in self.ingredients[:2]]
+
+    def search(self, pantry, **params):
+        response = self.anonymous.get(
+            "/api/recipes/pantry/", {"ingredients": pantry, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_recipes_are_ranked_by_share_of_pantry(self):
+        results = self.search(self.pantry)
+        self.assertEqual(
+            [recipe["id"] for recipe in results], [self.full.id, self.half.id]
+        )
+        self.assertEqual(results[0]["missing_ingredients"], [])
+        missing = results[1]["missing_ingredients"]
+        self.assertEqual(
+            [ingredient["id"] for ingredient in missing],
+            [ingredient.id for ingredient in self.ingredients[2:4]],
+        )
+
+    @mock.patch("recipes.pantry.connections")
+    def test_warm_up_builds_index(self, connections):
+        pantry.warm_up()
+        with self.assertNumQueries(0):
+            pantry_index.match(self.pantry)
+        connections.close_all.assert_called_once()
+
+    @mock.patch("recipes.pantry.connections")
+    def test_warm_up_without_database(self, connections):
+        with mock.patch.object(
+            PantryIndex, "build", side_effect=DatabaseError
+        ):
+            pantry.warm_up()
+        self.assertEqual(len(self.search(self.pantry)), 2)
+
+    def test_max_missing(self):
+        results = self.search(self.pantry, max_missing=1)
+        self.assertEqual([recipe["id"] for recipe in results], [self.full.id])
+
+    def test_index_follows_ingredient_changes(self):
+        self.search(self.pantry)
+        with self.captureOnCommitCallbacks(execute=True):
+            IngridientInRecipe.objects.filter(
+                recipe=self.full, ingredient=self.ingredients[1]
+            ).delete()
+        self.assertEqual(
+            [recipe["id"] for recipe in self.search(self.pantry[1:])],
+            [self.half.id],
+        )
+
+    def test_other_process_replays_published_changes(self):
+        other = PantryIndex()
+        other.match(self.pantry)
+        with self.captureOnCommitCallbacks(execute=True):
+            IngridientInRecipe.objects.create(
+                recipe=self.half, ingredient=self.ingredients[50], amount=1
+            )
+        snapshot = other._snapshot
+        matches = other.match([self.ingredients[50].id])
+        self.assertEqual([pk for pk, _, _ in matches[:10]], [self.half.id])
+        self.assertEqual(other._snapshot.version, snapshot.version + 1)
+
+    def test_refresh_does_not_change_published_snapshot(self):
+        pantry_index.match(self.pantry)
+        snapshot = pantry_index._snapshot
+        columns = dict(snapshot.columns)
+        IngridientInRecipe.objects.create(
+            recipe=self.full, ingredient=self.ingredients[50], amount=1
+        )
+        pantry_index.refresh([self.full.id])
+        self.assertEqual(snapshot.columns, columns)
+        self.assertNotIn(self.ingredients[50].id, snapshot.columns)
+        self.assertIn(
+            self.ingredients[50].id, pantry_index._snapshot.columns
+        )
@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.views import RecipeViewSet
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class QueryBudgetTestCase(FoodgramTestCase):
+
+    def assertSameQueries(self, baseline, *requests):
+        """Каждый из ``requests`` делает столько же запросов, сколько
+        ``baseline``; все они должны отвечать 2xx."""
+        with CaptureQueriesContext(connection) as queries:
+            response = baseline()
+        self.assertLess(response.status_code, 300, response.data)
+        for number, request in enumerate(requests):
+            with self.subTest(request=number):
+                with self.assertNumQueries(len(queries)):
+                    response = request()
+                self.assertLess(response.status_code, 300, response.data)
+
+    def add_recipes(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(count):
+                recipe = self.create_recipe(
+                    author=self.users[number % 3], ingredients=10, tags=3
+                )
+                Favorite.objects.create(user=self.user, recipe=recipe)
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+
+class RecipeQueryBudgetTests(QueryBudgetTestCase):
+    """Число запросов к базе не зависит ни от размера страницы, ни от числа
+    тегов и ингредиентов в рецептах."""
+
+    def test_recipe_list(self):
+        self.create_recipe(ingredients=1)
+        for client in (self.anonymous, self.authorized):
+
+            def recipes():
+                return client.get("/api/recipes/", {"limit": 6})
+
+            client.get("/api/recipes/", {"limit": 1})
+            # Новые рецепты сбрасывают кэш ответов для анонимов.
+            self.add_recipes(1)
+            with CaptureQueriesContext(connection) as queries:
+                recipes()
+            self.add_recipes(5)
+            with self.assertNumQueries(len(queries)):
+                response = recipes()
+            self.assertEqual(len(response.data["results"]), 6)
+        self.assertTrue(
+            any(recipe["is_favorited"] for recipe in response.data["results"])
+        )
+
+    def test_recipe_detail(self):
+        small = self.create_recipe(ingredients=1)
+        large = self.create_recipe(ingredients=100, tags=3)
+        for client in (self.anonymous, self.authorized):
+            client.get(f"/api/recipes/{self.create_recipe().id}/")
+            self.assertSameQueries(
+                lambda: client.get(f"/api/recipes/{small.id}/"),
+                lambda: client.get(f"/api/recipes/{large.id}/"),
+            )
+
+
+@mock.patch.object(RecipeViewSet, "fast_reads", False)
+class SerializerQueryBudgetTests(RecipeQueryBudgetTests):
+    """То же для сериализаторов DRF при ``FAST_RECIPE_READS=False``."""
+
+
+class SubscriptionQueryBudgetTests(QueryBudgetTestCase):
+    def test_subscriptions(self):
+        def subscriptions():
+            return self.authorized.get(
+                "/api/users/subscriptions/", {"recipes_limit": 3}
+            )
+
+        Follow.objects.create(user=self.user, author=self.users[1])
+        self.create_recipe(author=self.users[1])
+        subscriptions()
+        with CaptureQueriesContext(connection) as queries:
+            subscriptions()
+        Follow.objects.create(user=self.user, author=self.users[2])
+        for _ in range(5):
+            self.create_recipe(author=self.users[1], ingredients=10, tags=3)
+            self.create_recipe(author=self.users[2], ingredients=10, tags=3)
+        with self.assertNumQueries(len(queries)):
+            response = subscriptions()
+        self.assertEqual(
+            [len(author["recipes"]) for author in response.data["results"]],
+            [3, 3],
+        )
+        self.assertEqual(response.data["results"][0]["recipes_count"], 6)
@@ -0,0 +1,127 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, ShoppingCart
+
+from .base import FoodgramTestCase
+
+
+class RecipeCreateTests(FoodgramTestCase):
+    def create(self, ingredients, tags=1):
+        return self.authorized.post(
+            "/api/recipes/",
+            self.recipe_payload(
+                ingredients, tags=[tag.id for tag in self.tags[:tags]]
+            ),
+            format="json",
+        )
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        self.create(1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create(1)
+        self.assertEqual(response.status_code, 201)
+        for count, tags in ((30, 2), (100, 3)):
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(len(queries)):
+                    response = self.create(count, tags)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data["ingredients"]), count)
+                self.assertEqual(len(response.data["tags"]), tags)
+
+    def test_duplicate_ingredients_are_merged(self):
+        payload = self.recipe_payload(2)
+        payload["ingredients"].append(payload["ingredients"][0])
+        response = self.authorized.post(
+            "/api/recipes/", payload, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        amounts = {
+            ingredient["id"]: ingredient["amount"]
+            for ingredient in response.data["ingredients"]
+        }
+        self.assertEqual(amounts[self.ingredients[0].id], 20)
+
+    def test_unknown_ingredients_and_tags_are_rejected(self):
+        payload = self.recipe_payload(1, tags=[self.tags[0].id, 9999])
+        payload["ingredients"].append({"id": 9998, "amount": 1})
+        response = self.authorized.post(
+            "/api/recipes/", payload, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("9998", str(response.data["ingredients"]))
+        self.assertIn("9999", str(response.data["tags"]))
+        self.assertFalse(Recipe.objects.exists())
+
+
+class RecipeUpdateTests(FoodgramTestCase):
+    def patch(self, recipe, ingredients):
+        payload = self.recipe_payload(ingredients)
+        del payload["image"]
+        return self.authorized.patch(
+            f"/api/recipes/{recipe.id}/", payload, format="json"
+        )
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        # Первый запрос заполняет кэши токенов и версий.
+        self.patch(self.create_recipe(ingredients=1), 1)
+        recipe = self.create_recipe(ingredients=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(recipe, 1)
+        self.assertEqual(response.status_code, 200)
+        for count in (30, 100):
+            recipe = self.create_recipe(ingredients=count)
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(len(queries)):
+                    response = self.patch(recipe, count)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["ingredients"]), count)
+
+    def test_update_moves_updated_at(self):
+        recipe = self.create_recipe(ingredients=3)
+        before = recipe.updated_at
+        self.patch(recipe, 5)
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, before)
+
+    def test_ingredient_delete_moves_updated_at(self):
+        recipe = self.create_recipe(ingredients=3)
+        before = recipe.updated_at
+        self.ingredients[0].delete()
+        self.assertGreater(
+            Recipe.objects.get(pk=recipe.pk).updated_at, before
+        )
+
+
+class RecipeETagTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(ingredients=3)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+
+    def etags(self):
+        return [
+            self.authorized.get(url)["ETag"]
+            for url in (
+                "/api/recipes/",
+                "/api/recipes/download_shopping_cart/",
+            )
+        ]
+
+    def test_etags_move_only_after_commit(self):
+        before = self.etags()
+        payload = self.recipe_payload(5)
+        del payload["image"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized.patch(
+                f"/api/recipes/{self.recipe.id}/", payload, format="json"
+            )
+            self.assertEqual(self.etags(), before)
+        after = self.etags()
+        self.assertNotEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+        response = self.authorized.get(
+            "/api/recipes/download_shopping_cart/",
+            HTTP_IF_NONE_MATCH=before[1],
+        )
+        self.assertEqual(response.status_code, 200)
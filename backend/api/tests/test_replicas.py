@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import replicas
+
+from .base import FoodgramTestCase
+
+REPLICA = "replica0"
+
+
+@override_settings(
+    REPLICA_DATABASES=[REPLICA],
+    DATABASE_ROUTERS=["api.replicas.ReplicaRouter"],
+)
+class ReplicaRoutingTests(FoodgramTestCase):
+    """Вторая база SQLite — отдельное соединение с той же тестовой базой;
+    по числу запросов в каждом соединении видно, куда ушло чтение."""
+
+    # Реплика появляется в setUpClass, после проверок и создания баз.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[REPLICA] = dict(
+            connections[DEFAULT_DB_ALIAS].settings_dict,
+            TEST={"MIRROR": DEFAULT_DB_ALIAS},
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def setUp(self):
+        super().setUp()
+        replicas._down_until.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = self.create_recipe()
+        # Отметки о недавно сдвинутых версиях мешали бы выбору реплики.
+        cache.clear()
+        # Реплика должна видеть строки из ещё не закоммиченной транзакции
+        # теста, как видела бы их после репликации.
+        with connections[REPLICA].cursor() as cursor:
+            cursor.execute("PRAGMA read_uncommitted = 1")
+
+    def queries(self, request):
+        """Число запросов к основной базе и к реплике."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                response = request()
+        self.assertLess(response.status_code, 300)
+        return len(primary), len(replica)
+
+    def test_safe_methods_read_from_replica(self):
+        primary, replica = self.queries(
+            lambda: self.authorized.get("/api/recipes/")
+        )
+        self.assertGreater(replica, 0)
+        # Только поиск токена: пользователь ещё не известен.
+        self.assertEqual(primary, 1)
+        primary, replica = self.queries(
+            lambda: self.authorized.get(
+                f"/api/recipes/{self.recipe.id}/favorite/"
+            )
+        )
+        self.assertEqual(replica, 0)
+
+    def test_unsafe_methods_and_writers_use_primary(self):
+        with self.captureOnCommitCallbacks():
+            primary, replica = self.queries(
+                lambda: self.authorized.post(
+                    "/api/recipes/favorite/",
+                    {"recipes": [self.recipe.id]},
+                    format="json",
+                )
+            )
+            self.assertEqual(replica, 0)
+        # Версии не сдвинулись (коллбэки не выполнены), так что основную
+        # базу выбирает только закрепление за писавшим пользователем.
+        primary, replica = self.queries(
+            lambda: self.authorized.get("/api/recipes/")
+        )
+        self.assertEqual(replica, 0)
+        other = self.client_for(self.users[1])
+        primary, replica = self.queries(lambda: other.get("/api/recipes/"))
+        self.assertGreater(replica, 0)
+
+    def test_recently_changed_data_is_read_from_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = "Новое"
+            self.recipe.save()
+        primary, replica = self.queries(
+            lambda: self.anonymous.get("/api/recipes/")
+        )
+        self.assertEqual(replica, 0)
+        # Теги не менялись: их список по-прежнему читается с реплики.
+        primary, replica = self.queries(
+            lambda: self.anonymous.get("/api/tags/")
+        )
+        self.assertEqual((primary, replica), (0, 1))
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        # Чтение с такой реплики закончилось бы ошибкой и ответом 500.
+        with mock.patch.object(
+            connections[REPLICA],
+            "ensure_connection",
+            side_effect=OperationalError,
+        ) as ensure_connection:
+            for path in ("/api/tags/", "/api/recipes/"):
+                with CaptureQueriesContext(
+                    connections[DEFAULT_DB_ALIAS]
+                ) as primary:
+                    response = self.anonymous.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(len(primary), 0)
+        # Недоступная реплика не проверяется заново в каждом запросе.
+        ensure_connection.assert_called_once()
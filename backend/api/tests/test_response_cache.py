@@ -0,0 +1,47 @@
+from recipes.models import Recipe
+
+from .base import FoodgramTestCase
+
+
+class AnonymousRecipeCacheTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_recipe()
+        self.recipes()
+
+    def recipes(self):
+        return self.anonymous.get("/api/recipes/")
+
+    def test_login_and_password_change_keep_cache(self):
+        response = self.anonymous.post(
+            "/api/auth/token/login/",
+            {"email": self.user.email, "password": "secret-password-1"},
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("secret-password-2")
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.recipes()
+
+    def test_author_name_change_invalidates_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Другое"
+            self.user.save()
+        response = self.recipes()
+        self.assertEqual(
+            response.data["results"][0]["author"]["first_name"], "Другое"
+        )
+
+    def test_cache_moves_only_after_commit(self):
+        recipe = Recipe.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = "Новое"
+            recipe.save()
+            # До коммита версия прежняя: ответ из кэша, а не строки,
+            # которые другие соединения ещё не видят.
+            with self.assertNumQueries(0):
+                response = self.recipes()
+            self.assertEqual(response.data["results"][0]["name"], "Рецепт")
+        response = self.recipes()
+        self.assertEqual(response.data["results"][0]["name"], "Новое")
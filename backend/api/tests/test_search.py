@@ -0,0 +1,50 @@
+from recipes import fulltext
+from recipes.models import Recipe
+
+from .base import FoodgramTestCase
+
+
+class RecipeSearchTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.soup = self.create_recipe()
+        self.soup.name = "Борщ"
+        self.soup.save()
+        self.mention = self.create_recipe(author=self.users[1])
+        self.mention.text = "Подавать вместо борща"
+        self.mention.save()
+        fulltext.update_index()
+
+    def search(self, **params):
+        response = self.anonymous.get("/api/recipes/", params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_name_match_ranks_first(self):
+        self.assertEqual(
+            self.search(search="борщ"), [self.soup.id, self.mention.id]
+        )
+
+    def test_filters_apply_to_all_matches(self):
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=self.user,
+                name="Борщ",
+                text="Описание",
+                image="test.png",
+                cooking_time=5,
+            )
+            for _ in range(1100)
+        )
+        fulltext.update_index()
+        self.assertEqual(
+            self.search(search="борщ", author=self.users[1].id),
+            [self.mention.id],
+        )
+
+    def test_search_with_cursor_is_rejected(self):
+        response = self.anonymous.get(
+            "/api/recipes/", {"search": "борщ", "cursor": ""}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search", response.data)
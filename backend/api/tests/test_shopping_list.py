@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+from .base import FoodgramTestCase
+
+
+class ShoppingListTotalsTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(ingredients=5)
+        for user in self.users:
+            ShoppingCart.objects.create(user=user, recipe=self.recipe)
+
+    def test_recipe_update_changes_every_cart(self):
+        user_ids = [user.id for user in self.users]
+        payload = self.recipe_payload(30)
+        payload["ingredients"][0]["amount"] = 1
+        del payload["image"]
+        self.authorized.patch(
+            f"/api/recipes/{self.recipe.id}/", payload, format="json"
+        )
+        self.assertEqual(shopping_list.find_drift(user_ids), [])
+        self.assertEqual(
+            ShoppingListItem.objects.filter(user=self.users[1]).count(), 30
+        )
+        payload["ingredients"] = payload["ingredients"][10:]
+        self.authorized.patch(
+            f"/api/recipes/{self.recipe.id}/", payload, format="json"
+        )
+        self.assertEqual(shopping_list.find_drift(user_ids), [])
+        self.assertEqual(
+            ShoppingListItem.objects.filter(user=self.users[1]).count(), 20
+        )
+
+    def test_recipe_totals_queries_do_not_depend_on_size(self):
+        # Оба изменения и обновляют строки списков, и создают новые.
+        small = {ingredient.id: 1 for ingredient in self.ingredients[3:7]}
+        large = {ingredient.id: 1 for ingredient in self.ingredients}
+        with CaptureQueriesContext(connection) as queries:
+            shopping_list.change_recipe_totals(self.recipe.id, small)
+        with self.assertNumQueries(len(queries)):
+            shopping_list.change_recipe_totals(self.recipe.id, large)
+        amounts = dict(
+            ShoppingListItem.objects.filter(user=self.users[2]).values_list(
+                "ingredient_id", "amount"
+            )
+        )
+        self.assertEqual(len(amounts), 100)
+        self.assertEqual(amounts[self.ingredients[0].id], 2)
+        self.assertEqual(amounts[self.ingredients[4].id], 3)
+        self.assertEqual(amounts[self.ingredients[50].id], 1)
+
+
+class ShoppingListDownloadTests(FoodgramTestCase):
+    url = "/api/recipes/download_shopping_cart/"
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(ingredients=3)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+
+    def download(self, **headers):
+        return self.authorized.get(self.url, **headers)
+
+    def test_not_modified_skips_the_list_query(self):
+        etag = self.download()["ETag"]
+        with self.assertNumQueries(0):
+            response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_cart_and_recipe_changes(self):
+        first = self.download()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingCart.objects.create(
+                user=self.user, recipe=self.create_recipe(ingredients=1)
+            )
+        second = self.download()["ETag"]
+        self.assertNotEqual(first, second)
+        payload = self.recipe_payload(5)
+        del payload["image"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized.patch(
+                f"/api/recipes/{self.recipe.id}/", payload, format="json"
+            )
+        response = self.download(HTTP_IF_NONE_MATCH=second)
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("Ингредиент 4", content)
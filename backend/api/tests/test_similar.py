@@ -0,0 +1,80 @@
+from recipes import similar
+from recipes.models import IngridientInRecipe, SimilarRecipe
+
+from .base import FoodgramTestCase
+
+
+class SimilarRecipeTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipe_with(0, 1, 2, 3)
+        self.close = self.recipe_with(0, 1, 2)
+        self.far = self.recipe_with(0, 1, 9)
+        self.unrelated = self.recipe_with(50, 51)
+        self.same = self.recipe_with(0, 1, 2, 3)
+
+    def recipe_with(self, *numbers):
+        recipe = self.create_recipe(ingredients=0)
+        IngridientInRecipe.objects.bulk_create(
+            IngridientInRecipe(
+                recipe=recipe, ingredient=self.ingredients[number], amount=1
+            )
+            for number in numbers
+        )
+        return recipe
+
+    def similar_ids(self, recipe):
+        response = self.anonymous.get(f"/api/recipes/{recipe.id}/similar/")
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data]
+
+    def test_ranking_excludes_recipe_itself(self):
+        similar.update()
+        # При равном сходстве выше более новый рецепт.
+        self.assertEqual(
+            self.similar_ids(self.recipe),
+            [self.same.id, self.close.id, self.far.id],
+        )
+        self.assertEqual(self.similar_ids(self.unrelated), [])
+        self.assertEqual(
+            SimilarRecipe.objects.get(
+                recipe=self.recipe, similar=self.close
+            ).score,
+            0.75,
+        )
+
+    def test_edit_is_recomputed(self):
+        similar.update()
+        IngridientInRecipe.objects.filter(recipe=self.far).delete()
+        IngridientInRecipe.objects.bulk_create(
+            IngridientInRecipe(
+                recipe=self.far, ingredient=self.ingredients[number], amount=1
+            )
+            for number in (0, 1, 2, 3)
+        )
+        self.far.save()
+        changed, recomputed = similar.update()
+        self.assertEqual(changed, 1)
+        # Несвязанный рецепт не пересчитывается.
+        self.assertEqual(recomputed, 4)
+        self.assertEqual(
+            self.similar_ids(self.recipe),
+            [self.same.id, self.far.id, self.close.id],
+        )
+        self.assertEqual(
+            self.similar_ids(self.far),
+            [self.same.id, self.recipe.id, self.close.id],
+        )
+
+    def test_frequent_ingredients_add_no_candidates(self):
+        salted = self.recipe_with(0, 60)
+        similar.update(max_ingredient_recipes=4)
+        # Ингредиент 0 есть в пяти рецептах и сам кандидатов не даёт.
+        self.assertEqual(self.similar_ids(salted), [])
+        # Но учитывается в числе общих у кандидатов по редким.
+        self.assertEqual(
+            SimilarRecipe.objects.get(
+                recipe=self.recipe, similar=self.close
+            ).score,
+            0.75,
+        )
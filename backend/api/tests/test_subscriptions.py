@@ -0,0 +1,25 @@
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class SubscriptionTests(FoodgramTestCase):
+    def test_recipes_limit_keeps_newest(self):
+        author = self.users[1]
+        Follow.objects.create(user=self.user, author=author)
+        recipes = []
+        for number in range(5):
+            recipe = self.create_recipe(author=author)
+            recipe.name = f"Рецепт {number}"
+            recipe.save()
+            recipes.append(recipe)
+        response = self.authorized.get(
+            "/api/users/subscriptions/", {"recipes_limit": 3}
+        )
+        self.assertEqual(response.status_code, 200)
+        subscription = response.data["results"][0]
+        self.assertEqual(
+            [recipe["id"] for recipe in subscription["recipes"]],
+            [recipe.id for recipe in reversed(recipes[2:])],
+        )
+        self.assertEqual(subscription["recipes_count"], 5)
@@ -0,0 +1,84 @@
+from recipes import shopping_list
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+from .base import FoodgramTestCase
+
+
+class BulkRecipeListTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipes = [self.create_recipe(ingredients=3) for _ in range(3)]
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def send(self, method, url, recipe_ids):
+        response = getattr(self.authorized, method)(
+            url, {"recipes": recipe_ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            result["id"]: result["status"]
+            for result in response.data["results"]
+        }
+
+    def counters(self, field):
+        return list(
+            Recipe.objects.filter(id__in=self.ids)
+            .order_by("id")
+            .values_list(field, flat=True)
+        )
+
+    def test_add_reports_what_was_inserted(self):
+        url = "/api/recipes/favorite/"
+        self.send("post", url, self.ids[:1])
+        statuses = self.send("post", url, self.ids + [9999])
+        self.assertEqual(
+            statuses,
+            {
+                self.ids[0]: "already_added",
+                self.ids[1]: "added",
+                self.ids[2]: "added",
+                9999: "not_found",
+            },
+        )
+        self.assertEqual(self.counters("favorites_count"), [1, 1, 1])
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), len(self.ids)
+        )
+
+    def test_remove_changes_counters_and_totals_once(self):
+        url = "/api/recipes/shopping_cart/"
+        self.send("post", url, self.ids)
+        self.assertEqual(self.counters("in_carts_count"), [1, 1, 1])
+        statuses = self.send("delete", url, self.ids[:2] + [9999])
+        self.assertEqual(
+            statuses,
+            {
+                self.ids[0]: "removed",
+                self.ids[1]: "removed",
+                9999: "not_in_list",
+            },
+        )
+        self.assertEqual(self.counters("in_carts_count"), [0, 0, 1])
+        self.assertEqual(shopping_list.find_drift([self.user.id]), [])
+        self.assertEqual(
+            list(
+                ShoppingCart.objects.filter(user=self.user).values_list(
+                    "recipe_id", flat=True
+                )
+            ),
+            self.ids[2:],
+        )
+
+    def test_single_and_bulk_toggles_agree(self):
+        response = self.authorized.get(
+            f"/api/recipes/{self.ids[0]}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 201)
+        statuses = self.send("post", "/api/recipes/shopping_cart/", self.ids)
+        self.assertEqual(statuses[self.ids[0]], "already_added")
+        response = self.authorized.delete(
+            f"/api/recipes/{self.ids[1]}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters("in_carts_count"), [1, 0, 1])
+        self.assertEqual(shopping_list.find_drift([self.user.id]), [])
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+
+from recipes import shopping_list
+from recipes.counters import RECIPE_COUNTERS, change_recipe_counters
+from recipes.models import Recipe, ShoppingCart
+from recipes.signals import lists_changed_in_bulk
+from users.models import Follow
+
+from .cache import USER_LISTS_VERSION, bump_version
+from .serializers import SubscribeSerializer
+
+User = get_user_model()
+
+
+def lock_user_lists(user_id):
+    """Изменения списков одного пользователя идут по очереди: строка
+    пользователя заблокирована до конца транзакции, поэтому прочитанное
+    под блокировкой остаётся верным до записи."""
+    list(
+        User.objects.select_for_update()
+        .filter(pk=user_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def add_recipe(model, serializer_class, request, recipe_id):
+    """Добавляет рецепт в избранное или список покупок пользователя.
+
+    Повторное добавление ловится уникальным индексом, а не отдельным
+    SELECT: вставка идёт в точке сохранения, и при IntegrityError
+    возвращается 400.
+    """
+    recipe = get_object_or_404(Recipe, id=recipe_id)
+    try:
+        with transaction.atomic():
+            lock_user_lists(request.user.id)
+            instance = model.objects.create(user=request.user, recipe=recipe)
+    except IntegrityError:
+        return None, status.HTTP_400_BAD_REQUEST
+    serializer = serializer_class(
+        instance, context={"request": request, "image_rendition": "thumbnail"}
+    )
+    return serializer.data, status.HTTP_201_CREATED
+
+
+@transaction.atomic
+def remove_recipe(model, request, recipe_id):
+    lock_user_lists(request.user.id)
+    deleted, _ = model.objects.filter(
+        user=request.user, recipe_id=recipe_id
+    ).delete()
+    if not deleted:
+        return None, status.HTTP_400_BAD_REQUEST
+    return None, status.HTTP_204_NO_CONTENT
+
+
+def apply_changes(model, user_id, recipe_ids, sign):
+    """То, что для одиночных записей делают сигналы: счётчики рецептов и
+    итоги списка покупок, но одним запросом на весь набор."""
+    if not recipe_ids:
+        return
+    bump_version(USER_LISTS_VERSION.format(user_id))
+    change_recipe_counters(recipe_ids, RECIPE_COUNTERS[model], sign)
+    if model is ShoppingCart:
+        shopping_list.add_recipes(user_id, recipe_ids, sign)
+
+
+def listed_recipes(model, user_id, recipe_ids):
+    return set(
+        model.objects.filter(
+            user_id=user_id, recipe_id__in=recipe_ids
+        ).values_list("recipe_id", flat=True)
+    )
+
+
+def add_recipes(model, request, recipe_ids):
+    """Добавляет набор рецептов и возвращает результат по каждому id."""
+    with transaction.atomic():
+        lock_user_lists(request.user.id)
+        found = set(
+            Recipe.objects.filter(id__in=recipe_ids).values_list(
+                "id", flat=True
+            )
+        )
+        existing = listed_recipes(model, request.user.id, found)
+        added = [pk for pk in found if pk not in existing]
+        model.objects.bulk_create(
+            model(user=request.user, recipe_id=pk) for pk in added
+        )
+        apply_changes(model, request.user.id, added, 1)
+    results = []
+    for pk in recipe_ids:
+        if pk not in found:
+            result = "not_found"
+        elif pk in existing:
+            result = "already_added"
+        else:
+            result = "added"
+        results.append({"id": pk, "status": result})
+    return {"results": results}, status.HTTP_200_OK
+
+
+def remove_recipes(model, request, recipe_ids):
+    """Удаляет набор рецептов и возвращает результат по каждому id."""
+    with transaction.atomic():
+        lock_user_lists(request.user.id)
+        existing = listed_recipes(model, request.user.id, recipe_ids)
+        apply_changes(model, request.user.id, list(existing), -1)
+        with lists_changed_in_bulk():
+            model.objects.filter(
+                user=request.user, recipe_id__in=existing
+            ).delete()
+    results = [
+        {"id": pk, "status": "removed" if pk in existing else "not_in_list"}
+        for pk in recipe_ids
+    ]
+    return {"results": results}, status.HTTP_200_OK
+
+
+def subscribe(request, author_id):
+    author = get_object_or_404(User, id=author_id)
+    serializer = SubscribeSerializer(
+        context={"request": request},
+        data={"user": request.user.id, "author": author.id},
+    )
+    serializer.is_valid(raise_exception=True)
+    Follow.objects.create(author=author, user=request.user)
+    return serializer.data, status.HTTP_201_CREATED
+
+
+def unsubscribe(request, author_id):
+    author = get_object_or_404(User, id=author_id)
+    Follow.objects.filter(author=author, user=request.user).delete()
+    return None, status.HTTP_204_NO_CONTENT
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (FavoriteView, FollowView, IngredientViewSet, MyUserViewSet,
-                    RecipeViewSet, ShoppingCartView, TagViewSet)
+from .views import (BulkFavoriteView, BulkShoppingCartView, FavoriteView,
+                    FeedView, FollowView, IngredientViewSet, MyUserViewSet,
+                    PantryView, RecipeViewSet, ShoppingCartView, TagViewSet)
 
 app_name = "api"
 
@@ -24,6 +26,18 @@ urlpatterns = [
         ShoppingCartView.as_view(),
         name="shopping_cart",
     ),
+    path(
+        "recipes/favorite/",
+        BulkFavoriteView.as_view(),
+        name="favorite-bulk",
+    ),
+    path(
+        "recipes/shopping_cart/",
+        BulkShoppingCartView.as_view(),
+        name="shopping_cart-bulk",
+    ),
+    path("recipes/feed/", FeedView.as_view(), name="feed"),
+    path("recipes/pantry/", PantryView.as_view(), name="pantry"),
     path(
         "users/subscriptions/",
         FollowView.as_view(),
@@ -31,3 +45,24 @@ urlpatterns = [
     ),
     path("", include(router.urls)),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    urlpatterns = [
+        path(
+            "recipes/<int:id>/favorite/",
+            async_views.favorite,
+            name="favorite",
+        ),
+        path(
+            "recipes/<int:id>/shopping_cart/",
+            async_views.shopping_cart,
+            name="shopping_cart",
+        ),
+        path(
+            "users/<int:pk>/subscribe/",
+            async_views.subscribe,
+            name="users-subscribe",
+        ),
+    ] + urlpatterns
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import StreamingHttpResponse
-from django.shortcuts import get_object_or_404
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import (generics, mixins, permissions, status, views,
@@ -9,36 +13,70 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from recipes import feed
 from recipes.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.pantry import pantry_index
+from recipes.search import ingredient_index
 from users.models import Follow
 
+from . import readers, toggles
+from .cache import (USER_LISTS_VERSION, AnonymousResponseCacheMixin,
+                    ConditionalGetMixin, get_versions, request_fingerprint)
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import (CursorOrPageNumberPagination,
+                         CustomPageNumberPagination, FeedCursorPagination)
 from .permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS, stream_shopping_list
+from .replicas import ReplicaReadMixin
 from .serializers import (FavoriteSerializer, FolllowSerializer,
                           IngredientSerializer, MyUserSerializer,
-                          RecipeCreateSerializer, RecipeGetSerializer,
-                          ShoppingCartSerializer, SubscribeSerializer,
-                          TagSerializer, UserRegistrationSerializer)
+                          PantrySerializer, RecipeCreateSerializer,
+                          RecipeGetSerializer, RecipeIdsSerializer,
+                          ShoppingCartSerializer, TagSerializer,
+                          UserRegistrationSerializer)
 
 User = get_user_model()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    AnonymousResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
+    cache_dependencies = ("tag",)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    AnonymousResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    search_fields = ("^name",)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+    cache_dependencies = ("ingredient",)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("name"):
+            return self.conditional_response(
+                self.search, request, *args, **kwargs
+            )
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        return Response(
+            ingredient_index.search(request.query_params["name"])
+        )
 
 
 class MyUserViewSet(
@@ -90,102 +128,258 @@ class MyUserViewSet(
         url_path="subscribe",
     )
     def subscribe(self, request, pk=None):
-        author = get_object_or_404(User, id=pk)
-        data = {
-            "user": request.user.id,
-            "author": author.id,
-        }
-
         if request.method == "GET":
-            serializer = SubscribeSerializer(
-                context={"request": request}, data=data
-            )
-            serializer.is_valid(raise_exception=True)
-            instance = Follow.objects.create(author=author, user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        instance = Follow.objects.filter(author=author, user=request.user)
-        instance.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+            data, status_code = toggles.subscribe(request, pk)
+        else:
+            data, status_code = toggles.unsubscribe(request, pk)
+        return Response(data, status=status_code)
 
 
 class FavoriteView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, id=None):
-        obj = Favorite.objects.filter(user=request.user, recipe_id=id).exists()
-        recipe = get_object_or_404(Recipe, id=id)
-
-        if obj:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        data = {"recipe": recipe}
-        serializer = FavoriteSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        Favorite.objects.create(user=request.user, recipe_id=id)
-
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        data, status_code = toggles.add_recipe(
+            Favorite, FavoriteSerializer, request, id
+        )
+        return Response(data, status=status_code)
 
     def delete(self, request, id=None):
-        obj = Favorite.objects.filter(user=request.user, recipe_id=id).exists()
-        if not obj:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        Favorite.objects.filter(user=request.user, recipe_id=id).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        data, status_code = toggles.remove_recipe(Favorite, request, id)
+        return Response(data, status=status_code)
 
 
 class ShoppingCartView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, id=None):
-        obj = ShoppingCart.objects.filter(
-            user=request.user, recipe_id=id
-        ).exists()
-        recipe = get_object_or_404(Recipe, id=id)
-
-        if obj:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        data = {"recipe": recipe}
-        serializer = ShoppingCartSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        ShoppingCart.objects.create(user=request.user, recipe_id=id)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        data, status_code = toggles.add_recipe(
+            ShoppingCart, ShoppingCartSerializer, request, id
+        )
+        return Response(data, status=status_code)
 
     def delete(self, request, id=None):
-        obj = ShoppingCart.objects.filter(
-            user=request.user, recipe_id=id
-        ).exists()
-        if not obj:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        ShoppingCart.objects.filter(user=request.user, recipe_id=id).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        data, status_code = toggles.remove_recipe(ShoppingCart, request, id)
+        return Response(data, status=status_code)
+
 
+class BulkRecipeListView(views.APIView):
+    """Добавление и удаление до 100 рецептов за запрос:
+    ``{"recipes": [id, ...]}`` в теле POST или DELETE."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    model = None
+
+    def get_recipe_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["recipes"]
+
+    def post(self, request):
+        data, status_code = toggles.add_recipes(
+            self.model, request, self.get_recipe_ids(request)
+        )
+        return Response(data, status=status_code)
 
-class FollowView(generics.ListAPIView):
+    def delete(self, request):
+        data, status_code = toggles.remove_recipes(
+            self.model, request, self.get_recipe_ids(request)
+        )
+        return Response(data, status=status_code)
+
+
+class BulkFavoriteView(BulkRecipeListView):
+    model = Favorite
+
+
+class BulkShoppingCartView(BulkRecipeListView):
+    model = ShoppingCart
+
+
+class FollowView(ReplicaReadMixin, generics.ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = FolllowSerializer
+    pagination_class = CursorOrPageNumberPagination
+
+    def get_recipes_limit(self):
+        try:
+            limit = int(self.request.query_params["recipes_limit"])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit > 0 else None
 
     def get_queryset(self):
-        queryset = User.objects.filter(follow__user_id=self.request.user.id)
+        # Новые рецепты автора — по индексу (author, -id); без сортировки
+        # подзапрос взял бы первые по названию.
+        recipes = Recipe.objects.order_by("-id")
+        limit = self.get_recipes_limit()
+        if limit is not None:
+            recipes = recipes.filter(
+                id__in=Recipe.objects.filter(author=OuterRef("author"))
+                .order_by("-id")
+                .values("id")[:limit]
+            )
+        queryset = (
+            User.objects.filter(follow__user_id=self.request.user.id)
+            .annotate(
+                recipes_count=Coalesce("stats__recipes_count", 0),
+                is_subscribed=Value(True),
+            )
+            .prefetch_related(Prefetch("recipe", queryset=recipes))
+            .order_by("id")
+        )
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = FolllowSerializer(
-            queryset, many=True, context={"request": request}
-        )
-        page = self.paginate_queryset(serializer.data)
-        return self.get_paginated_response(page)
 
+class FeedView(ReplicaReadMixin, generics.ListAPIView):
+    """Новые рецепты авторов, на которых подписан пользователь."""
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = readers.RecipeReader
+    pagination_class = FeedCursorPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        return feed.recipes(readers.recipe_rows(user), user.id)
 
-class RecipeViewSet(ModelViewSet):
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["image_rendition"] = "card"
+        return context
+
+
+class PantryView(generics.GenericAPIView):
+    """Что приготовить из ингредиентов ``?ingredients=``: рецепты по
+    убыванию доли имеющихся ингредиентов, с недостающими в
+    ``missing_ingredients``; ``?max_missing=`` ограничивает их число."""
+
+    pagination_class = CustomPageNumberPagination
+
+    def get(self, request):
+        params = PantrySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        pantry = set(params.validated_data["ingredients"])
+        matches = pantry_index.match(
+            pantry, params.validated_data.get("max_missing")
+        )
+        page = [pk for pk, _, _ in self.paginate_queryset(matches)]
+        rows = {
+            row["id"]: row
+            for row in readers.recipe_rows(request.user).filter(id__in=page)
+        }
+        reader = readers.RecipeReader(
+            [rows[pk] for pk in page if pk in rows],
+            many=True,
+            context={"request": request, "image_rendition": "card"},
+        )
+        data = reader.data
+        for recipe in data:
+            recipe["missing_ingredients"] = [
+                ingredient
+                for ingredient in recipe["ingredients"]
+                if ingredient["id"] not in pantry
+            ]
+        return self.get_paginated_response(data)
+
+
+class RecipeViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    AnonymousResponseCacheMixin,
+    ModelViewSet,
+):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = [
         DjangoFilterBackend,
     ]
     filterset_class = RecipeFilter
+    pagination_class = CursorOrPageNumberPagination
+    cache_dependencies = ("recipe", "tag", "ingredient", "user")
+    fast_reads = settings.FAST_RECIPE_READS
+
+    def use_fast_reads(self):
+        return (
+            self.fast_reads
+            and self.request.method == "GET"
+            and self.action in ("list", "retrieve")
+        )
+
+    def get_queryset(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return Recipe.objects.all()
+        user = self.request.user
+        if self.use_fast_reads():
+            return readers.recipe_rows(user)
+        ingredients = Prefetch(
+            "ingridient_in_recipe",
+            queryset=IngridientInRecipe.objects.select_related("ingredient"),
+        )
+        if not user.is_authenticated:
+            return (
+                Recipe.objects.select_related("author")
+                .prefetch_related("tags", ingredients)
+                .annotate(
+                    is_favorited=Value(False),
+                    is_in_shopping_cart=Value(False),
+                )
+            )
+        authors = User.objects.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef("pk"))
+            )
+        )
+        return Recipe.objects.prefetch_related(
+            Prefetch("author", queryset=authors), "tags", ingredients
+        ).annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == "list":
+            context["image_rendition"] = "card"
+        elif self.action == "retrieve":
+            context["image_rendition"] = "large"
+        return context
+
+    def get_updated_at(self):
+        if not hasattr(self, "_updated_at"):
+            try:
+                self._updated_at = (
+                    Recipe.objects.filter(pk=self.kwargs["pk"])
+                    .values_list("updated_at", flat=True)
+                    .first()
+                )
+            except (TypeError, ValueError):
+                self._updated_at = None
+        return self._updated_at
+
+    def get_etag_parts(self, request):
+        if self.action != "retrieve":
+            return super().get_etag_parts(request)
+        # Правки тегов, ингредиентов и автора тоже сдвигают updated_at.
+        updated_at = self.get_updated_at()
+        if updated_at is None:
+            return None
+        return [updated_at.isoformat()] + self.get_user_etag_parts(request)
+
+    def get_last_modified(self, request):
+        # У пользователя в ответе ещё избранное и подписки, у которых нет
+        # даты изменения, поэтому ему — только ETag.
+        if self.action == "retrieve" and not request.user.is_authenticated:
+            return self.get_updated_at()
+        return None
 
     def get_serializer_class(self):
         method = self.request.method
+        if self.use_fast_reads():
+            return readers.RecipeReader
         if method == "GET":
             return RecipeGetSerializer
         return RecipeCreateSerializer
@@ -193,36 +387,71 @@ class RecipeViewSet(ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """Похожие по ингредиентам рецепты из ``SimilarRecipe``."""
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        rows = list(
+            readers.recipe_rows(request.user)
+            .filter(similar_to__recipe_id=pk)
+            .order_by("similar_to__position")
+        )
+        if not rows and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        reader = readers.RecipeReader(
+            rows,
+            many=True,
+            context={"request": request, "image_rendition": "card"},
+        )
+        return Response(reader.data)
+
     @action(
         detail=False,
         methods=["get"],
         permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
-        res_queryset = {}
-        queryset = IngridientInRecipe.objects.filter(
-            recipe__shopping_cart__user__id=request.user.id
-        ).values_list(
-            "ingredient__name",
-            "ingredient__measurement_unit",
-            "amount",
-            named=True,
-        )
-        for amount in queryset:
-            name = (
-                amount.ingredient__name,
-                amount.ingredient__measurement_unit,
+        # Список меняется только с корзиной пользователя, составом рецептов
+        # и ингредиентами — тег из их версий проверяется до запроса к базе.
+        format = request.accepted_renderer.format
+        etag = quote_etag(
+            request_fingerprint(
+                request,
+                self,
+                [format, request.user.pk]
+                + get_versions(
+                    [
+                        USER_LISTS_VERSION.format(request.user.pk),
+                        "recipe",
+                        "ingredient",
+                    ]
+                ),
+            )
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        rows = [
+            {"name": name, "measurement_unit": unit, "amount": amount}
+            for name, unit, amount in ShoppingListItem.objects.filter(
+                user=request.user
+            )
+            .order_by("ingredient__name", "ingredient__measurement_unit")
+            .values_list(
+                "ingredient__name", "ingredient__measurement_unit", "amount"
             )
-            if name in res_queryset:
-                res_queryset[name] += amount.amount
-            else:
-                res_queryset[name] = amount.amount
-        rows = (
-            [ingredient[0], str(res_queryset[ingredient]), ingredient[1], "\n"]
-            for ingredient in res_queryset
-        )
-        inputs = (", ".join(row) for row in rows)
-
-        response = StreamingHttpResponse(inputs, content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="recipes.txt"'
+        ]
+        response = StreamingHttpResponse(
+            stream_shopping_list(rows, format),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="recipes.{}"'.format(format)
+        )
+        response["ETag"] = etag
         return response
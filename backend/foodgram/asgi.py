@@ -1,7 +1,15 @@
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_asgi_application()
+
+from recipes import pantry  # noqa: E402
+
+# Только при запуске сервера: миграции и команды manage.py этот модуль не
+# импортируют.
+if settings.PANTRY_WARM_UP:
+    pantry.warm_up()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import fulltext
 from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
 
@@ -41,9 +42,13 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     empty_value_display = "-пусто-"
 
-    @admin.display(description="В избранном")
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        fulltext.update_index([form.instance.pk])
+
+    @admin.display(description="В избранном", ordering="favorites_count")
     def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 class FavoriteAdmin(admin.ModelAdmin):
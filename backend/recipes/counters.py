@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.db.models import (Count, F, IntegerField, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Coalesce
+
+from users.models import Follow, UserStats
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# Счётчик рецепта, который меняется при добавлении его в список.
+RECIPE_COUNTERS = {
+    Favorite: "favorites_count",
+    ShoppingCart: "in_carts_count",
+}
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    Recipe.objects.filter(pk=recipe_id).update(**{field: F(field) + delta})
+
+
+def change_recipe_counters(recipe_ids, field, delta):
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        **{field: F(field) + delta}
+    )
+
+
+def change_author_counter(user_id, field, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                "recipes_count": Recipe.objects.filter(
+                    author_id=user_id
+                ).count(),
+                "followers_count": Follow.objects.filter(
+                    author_id=user_id
+                ).count(),
+                "following_count": Follow.objects.filter(
+                    user_id=user_id
+                ).count(),
+            },
+        )
+
+
+def fix_counters(queryset, counters, batch_size=1000):
+    actual = {
+        "actual_{}".format(field): expression
+        for field, expression in counters.items()
+    }
+    drift = Q()
+    for field in counters:
+        drift |= ~Q(**{field: F("actual_{}".format(field))})
+    stale = list(
+        queryset.annotate(**actual).filter(drift).values_list("pk", flat=True)
+    )
+    for start in range(0, len(stale), batch_size):
+        queryset.filter(pk__in=stale[start:start + batch_size]).update(
+            **counters
+        )
+    return len(stale)
+
+
+def reconcile_counters():
+    """Пересчитывает все денормализованные счётчики одним проходом.
+
+    Возвращает число исправленных рецептов и авторов.
+    """
+    recipes = fix_counters(
+        Recipe.objects.all(),
+        {
+            "favorites_count": count_subquery(Favorite, "recipe"),
+            "in_carts_count": count_subquery(ShoppingCart, "recipe"),
+        },
+    )
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list("pk", flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    authors = fix_counters(
+        UserStats.objects.all(),
+        {
+            "recipes_count": count_subquery(Recipe, "author"),
+            "followers_count": count_subquery(Follow, "author"),
+            "following_count": count_subquery(Follow, "user"),
+        },
+    )
+    return recipes, authors
@@ -0,0 +1,137 @@
+"""Лента подписок: новые рецепты авторов, на которых подписан пользователь.
+
+Для большинства пользователей лента — один запрос: рецепты, соединённые с
+их подписками, по индексу ``(author, -id)``. Тем, кто подписан хотя бы на
+``FEED_FANOUT_FOLLOWING`` авторов, такое соединение обходится дорого,
+поэтому у них лента хранится готовой в ``FeedEntry``: новый рецепт
+раскладывается по лентам подписчиков при публикации (fan-out on write), а
+подписка и отписка добавляют и убирают рецепты автора.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from users.models import Follow, UserStats
+
+from .models import FeedEntry, Recipe
+
+TIMELINE = "timeline"
+MERGE = "merge"
+
+# Ключ сортировки ленты: id рецепта, но взятый из таблицы, по индексу
+# которой идёт выборка, — иначе СУБД сортирует всю ленту целиком.
+POSITION = "feed_position"
+
+
+def has_timeline(user_id):
+    return UserStats.objects.filter(
+        user_id=user_id,
+        following_count__gte=settings.FEED_FANOUT_FOLLOWING,
+    ).exists()
+
+
+def timeline_recipes(queryset, user_id):
+    return queryset.filter(feed_entries__user_id=user_id).annotate(
+        **{POSITION: F("feed_entries__recipe_id")}
+    )
+
+
+def merged_recipes(queryset, user_id):
+    return queryset.filter(author__follow__user_id=user_id).annotate(
+        **{POSITION: F("id")}
+    )
+
+
+def recipes(queryset, user_id, strategy=None):
+    """Рецепты ленты из ``queryset``, от новых к старым по ``POSITION``."""
+    if strategy is None:
+        strategy = TIMELINE if has_timeline(user_id) else MERGE
+    if strategy == TIMELINE:
+        queryset = timeline_recipes(queryset, user_id)
+    else:
+        queryset = merged_recipes(queryset, user_id)
+    return queryset.order_by("-" + POSITION)
+
+
+def add_recipe(recipe):
+    """Раскладывает новый рецепт по хранимым лентам подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=recipe.author_id,
+        user__stats__following_count__gte=settings.FEED_FANOUT_FOLLOWING,
+    ).values_list("user_id", flat=True)
+    recipe_id, author_id = recipe.pk, recipe.author_id
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def following_count(user_id):
+    """Число подписок по самим ``Follow``, а не по ``UserStats``: счётчик
+    обновляет другой приёмник того же сигнала, и порядок приёмников не
+    гарантирован."""
+    return Follow.objects.filter(user_id=user_id).count()
+
+
+def follow(user_id, author_id):
+    """Вызывается после сохранения подписки."""
+    count = following_count(user_id)
+    if count == settings.FEED_FANOUT_FOLLOWING:
+        build(user_id)
+    elif count > settings.FEED_FANOUT_FOLLOWING:
+        fill(user_id, Recipe.objects.filter(author_id=author_id))
+
+
+def unfollow(user_id, author_id):
+    """Вызывается после удаления подписки."""
+    count = following_count(user_id)
+    if count == settings.FEED_FANOUT_FOLLOWING - 1:
+        FeedEntry.objects.filter(user_id=user_id).delete()
+    elif count >= settings.FEED_FANOUT_FOLLOWING:
+        FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def fill(user_id, queryset):
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=pk, author_id=author_id)
+            for pk, author_id in queryset.order_by()
+            .values_list("id", "author_id")
+            .iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def build(user_id):
+    """Собирает хранимую ленту пользователя заново."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    fill(user_id, merged_recipes(Recipe.objects.all(), user_id))
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Пересобирает хранимые ленты.
+
+    Без ``user_ids`` — для всех: ленты пользователей ниже порога удаляются,
+    остальные собираются заново. Возвращает число собранных лент.
+    """
+    stats = UserStats.objects.filter(
+        following_count__gte=settings.FEED_FANOUT_FOLLOWING
+    )
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    owners = list(stats.values_list("user_id", flat=True))
+    for user_id in owners:
+        fill(user_id, merged_recipes(Recipe.objects.all(), user_id))
+    return len(owners)
@@ -0,0 +1,117 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+from .models import Ingredient, Recipe
+
+CONFIG = "russian"
+FTS_TABLE = "recipes_recipe_fts"
+
+
+def documents(recipe_ids):
+    """Тексты для индекса: название, описание и названия ингредиентов."""
+    names = {}
+    for recipe_id, name in Ingredient.objects.filter(
+        ingridient_in_recipe__recipe_id__in=recipe_ids
+    ).values_list("ingridient_in_recipe__recipe_id", "name"):
+        names.setdefault(recipe_id, []).append(name)
+    for recipe_id, name, text in Recipe.objects.filter(
+        pk__in=recipe_ids
+    ).values_list("pk", "name", "text"):
+        yield recipe_id, name, text, " ".join(names.get(recipe_id, ()))
+
+
+def update_index(recipe_ids=None):
+    """Пересчитывает поисковые документы рецептов (всех, если ``None``)."""
+    if recipe_ids is None:
+        recipe_ids = Recipe.objects.values_list("pk", flat=True)
+    recipe_ids = list(recipe_ids)
+    if connection.vendor == "postgresql":
+        # Импорт здесь: агрегаты postgres требуют psycopg2.
+        from django.contrib.postgres.aggregates import StringAgg
+
+        ingredients = Subquery(
+            Ingredient.objects.filter(
+                ingridient_in_recipe__recipe=OuterRef("pk")
+            )
+            .values("ingridient_in_recipe__recipe")
+            .annotate(names=StringAgg("name", " "))
+            .values("names")
+        )
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=SearchVector("name", weight="A", config=CONFIG)
+            + SearchVector(ingredients, weight="B", config=CONFIG)
+            + SearchVector("text", weight="C", config=CONFIG)
+        )
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "DELETE FROM {} WHERE rowid = %s".format(FTS_TABLE),
+                [(recipe_id,) for recipe_id in recipe_ids],
+            )
+            cursor.executemany(
+                "INSERT INTO {} (rowid, name, ingredients, text) "
+                "VALUES (%s, %s, %s, %s)".format(FTS_TABLE),
+                [
+                    (recipe_id, name, ingredients, text)
+                    for recipe_id, name, text, ingredients in documents(
+                        recipe_ids
+                    )
+                ],
+            )
+
+
+def remove_from_index(recipe_id):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {} WHERE rowid = %s".format(FTS_TABLE),
+                [recipe_id],
+            )
+
+
+def fts5_query(query):
+    terms = query.replace('"', " ").split()
+    return " ".join('"{}"*'.format(term) for term in terms)
+
+
+def search(queryset, query):
+    """Фильтрует рецепты по запросу и сортирует по релевантности.
+
+    На PostgreSQL используется ``search_vector`` с GIN-индексом, на SQLite
+    — виртуальная таблица FTS5, на остальных СУБД — поиск по подстроке в
+    названии.
+    """
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(
+            query, config=CONFIG, search_type="websearch"
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-id")
+        )
+    if connection.vendor == "sqlite":
+        match = fts5_query(query)
+        if not match:
+            return queryset.none()
+        # Таблица FTS5 присоединяется к запросу рецептов: остальные
+        # фильтры применяются в том же SQL, а выдача не обрезается до них.
+        # Соединение с виртуальной таблицей ORM выражает только через
+        # extra().
+        return queryset.extra(
+            select={
+                "rank": "bm25({}, 10.0, 4.0, 1.0)".format(FTS_TABLE),
+            },
+            tables=[FTS_TABLE],
+            where=[
+                "{} MATCH %s".format(FTS_TABLE),
+                "{}.rowid = {}.id".format(
+                    FTS_TABLE,
+                    connection.ops.quote_name(Recipe._meta.db_table),
+                ),
+            ],
+            params=[match],
+        ).order_by("rank", "-id")
+    return queryset.filter(name__icontains=query)
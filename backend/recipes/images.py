@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+RENDITIONS_DIR = "media/renditions"
+
+# Имя варианта -> (ширина, высота, обрезать ли до точного размера).
+RENDITIONS = {
+    "thumbnail": (160, 160, True),
+    "card": (480, 480, False),
+    "large": (1280, 1280, False),
+}
+
+FORMATS = {
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+}
+
+
+def render(image, size, crop):
+    width, height = size
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def generate_renditions(image_file):
+    """Сохраняет все варианты изображения рецепта в хранилище.
+
+    Возвращает словарь вида ``{"source": имя оригинала,
+    "thumbnail": {"jpeg": путь, "webp": путь}, ...}``.
+    """
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+    image_file.open("rb")
+    try:
+        with Image.open(image_file) as original:
+            original = ImageOps.exif_transpose(original).convert("RGB")
+    finally:
+        image_file.close()
+
+    renditions = {"source": image_file.name}
+    for name, (width, height, crop) in RENDITIONS.items():
+        variant = render(original, (width, height), crop)
+        renditions[name] = {}
+        for key, (pil_format, extension, options) in FORMATS.items():
+            buffer = BytesIO()
+            variant.save(buffer, pil_format, **options)
+            path = default_storage.save(
+                "{}/{}_{}.{}".format(RENDITIONS_DIR, stem, name, extension),
+                ContentFile(buffer.getvalue()),
+            )
+            renditions[name][key] = path
+    return renditions
+
+
+def delete_renditions(renditions):
+    for name in RENDITIONS:
+        for path in renditions.get(name, {}).values():
+            default_storage.delete(path)
@@ -0,0 +1,103 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import feed
+from recipes.models import FeedEntry, Recipe
+from users.models import UserStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "compare the merge query and the stored timeline for subscription "
+        "feeds: page latency and identical results"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=5,
+            help="benchmark the users with the most subscriptions",
+        )
+        parser.add_argument("--user", help="benchmark one user by username")
+        parser.add_argument("--pages", type=int, default=10)
+        parser.add_argument("--page-size", type=int, default=6)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user_ids = list(
+                User.objects.filter(username=options["user"]).values_list(
+                    "id", flat=True
+                )
+            )
+        else:
+            user_ids = list(
+                UserStats.objects.filter(following_count__gt=0)
+                .order_by("-following_count")
+                .values_list("user_id", flat=True)[: options["users"]]
+            )
+        if not user_ids:
+            raise CommandError("Нет пользователей с подписками")
+        for user_id in user_ids:
+            # Лента собирается для замера и откатывается вместе с ним.
+            with transaction.atomic():
+                self.benchmark(user_id, options)
+                transaction.set_rollback(True)
+
+    def benchmark(self, user_id, options):
+        started = time.perf_counter()
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        feed.fill(user_id, feed.merged_recipes(Recipe.objects.all(), user_id))
+        build = time.perf_counter() - started
+        results = {}
+        for strategy in (feed.MERGE, feed.TIMELINE):
+            best = None
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                pages = self.walk(user_id, strategy, options)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[strategy] = pages, best / max(len(pages), 1)
+        merge_pages, merge_time = results[feed.MERGE]
+        timeline_pages, timeline_time = results[feed.TIMELINE]
+        if merge_pages != timeline_pages:
+            raise CommandError(
+                f"Ленты пользователя {user_id} различаются: "
+                f"{merge_pages[:2]} и {timeline_pages[:2]}"
+            )
+        self.stdout.write(
+            "Пользователь {}: подписок {}, рецептов в ленте {}, страниц {}\n"
+            "  merge: {:.2f} мс/стр, timeline: {:.2f} мс/стр, x{:.1f}; "
+            "сборка ленты {:.1f} мс".format(
+                user_id,
+                feed.following_count(user_id),
+                FeedEntry.objects.filter(user_id=user_id).count(),
+                len(merge_pages),
+                merge_time * 1000,
+                timeline_time * 1000,
+                merge_time / timeline_time if timeline_time else 0,
+                build * 1000,
+            )
+        )
+
+    def walk(self, user_id, strategy, options):
+        """Первые ``--pages`` страниц ленты так, как их листает курсор."""
+        pages, last = [], None
+        for _ in range(options["pages"]):
+            queryset = feed.recipes(Recipe.objects.all(), user_id, strategy)
+            if last is not None:
+                queryset = queryset.filter(**{feed.POSITION + "__lt": last})
+            page = list(
+                queryset.values_list("id", flat=True)[: options["page_size"]]
+            )
+            if not page:
+                break
+            pages.append(page)
+            last = page[-1]
+        return pages
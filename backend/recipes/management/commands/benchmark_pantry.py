@@ -0,0 +1,95 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from recipes.models import IngridientInRecipe
+from recipes.pantry import pantry_index
+
+
+def orm_page(pantry, limit):
+    """Та же выдача, что ``PantryIndex.match``, агрегацией в базе."""
+    return list(
+        IngridientInRecipe.objects.order_by()
+        .values("recipe_id")
+        .annotate(
+            matched=Count(
+                "ingredient_id",
+                filter=Q(ingredient_id__in=pantry),
+                distinct=True,
+            ),
+            size=Count("ingredient_id", distinct=True),
+        )
+        .filter(matched__gt=0)
+        .annotate(coverage=Cast("matched", FloatField()) / F("size"))
+        .order_by("-coverage", "size", "-recipe_id")
+        .values_list("recipe_id", flat=True)[:limit]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "compare pantry matching by an ORM aggregate and by the in-memory "
+        "ingredient bitset index: latency and identical rankings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument(
+            "--ingredients",
+            type=int,
+            default=10,
+            help="ingredients in each pantry",
+        )
+        parser.add_argument("--limit", type=int, default=6)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Кладовые собираются из ингредиентов пропорционально тому, как
+        # часто они встречаются в рецептах.
+        ingredients = list(
+            IngridientInRecipe.objects.values_list("ingredient_id", flat=True)
+        )
+        if not ingredients:
+            raise CommandError("Нет рецептов: сначала generate_data")
+        size = min(options["ingredients"], len(set(ingredients)))
+        rng = random.Random(options["seed"])
+        pantries = []
+        for _ in range(options["queries"]):
+            pantry = set()
+            while len(pantry) < size:
+                pantry.add(rng.choice(ingredients))
+            pantries.append(pantry)
+
+        started = time.perf_counter()
+        pantry_index.build()
+        build = time.perf_counter() - started
+        pantry_index.match(pantries[0])
+
+        limit = options["limit"]
+        timings = {"orm": 0.0, "index": 0.0}
+        for pantry in pantries:
+            started = time.perf_counter()
+            expected = orm_page(pantry, limit)
+            timings["orm"] += time.perf_counter() - started
+            started = time.perf_counter()
+            got = [pk for pk, _, _ in pantry_index.match(pantry)[:limit]]
+            timings["index"] += time.perf_counter() - started
+            if got != expected:
+                raise CommandError(
+                    f"Выдача различается для {sorted(pantry)}: "
+                    f"{expected} и {got}"
+                )
+        count = len(pantries)
+        self.stdout.write(
+            "Выдача совпадает на {} запросах; индекс построен за {:.1f} с\n"
+            "  orm: {:.2f} мс, index: {:.2f} мс, x{:.1f}".format(
+                count,
+                build,
+                timings["orm"] / count * 1000,
+                timings["index"] / count * 1000,
+                timings["orm"] / timings["index"],
+            )
+        )
@@ -0,0 +1,151 @@
+import base64
+import io
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 10, 10)).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        "time recipe create and update through the API for growing "
+        "ingredient counts and count their queries; all writes are rolled "
+        "back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ingredients",
+            default="1,10,30,100",
+            help="comma-separated ingredient counts",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--user", help="username of the author; the first user by default"
+        )
+        parser.add_argument("--host", default="localhost")
+
+    def handle(self, *args, **options):
+        values = options["ingredients"].split(",")
+        try:
+            counts = [int(value) for value in values]
+        except ValueError:
+            raise CommandError("--ingredients: числа через запятую")
+        users = User.objects.order_by("id")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+        self.user = users.first()
+        if self.user is None:
+            raise CommandError("Пользователь не найден")
+        # Обновление заменяет состав на другой того же размера.
+        ingredients = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)[
+                : max(counts) * 2
+            ]
+        )
+        tag = Tag.objects.order_by("id").values_list("id", flat=True).first()
+        if len(ingredients) < max(counts) * 2 or tag is None:
+            raise CommandError("Мало ингредиентов или нет тегов")
+        self.factory = APIRequestFactory()
+        self.host = options["host"]
+        self.images = []
+        self.stdout.write(
+            "ингредиентов  create, мс (запросов)  update, мс (запросов)"
+        )
+        try:
+            # Картинки рендерятся после коммита, а коммита не будет.
+            with transaction.atomic():
+                # Первый запрос заполняет кэши токенов и версий.
+                self.measure(ingredients[:1], ingredients[1:2], tag)
+                for count in counts:
+                    self.report(
+                        count,
+                        [
+                            self.measure(
+                                ingredients[:count],
+                                ingredients[count: count * 2],
+                                tag,
+                            )
+                            for _ in range(options["repeat"])
+                        ],
+                    )
+                transaction.set_rollback(True)
+        finally:
+            for image in self.images:
+                image.storage.delete(image.name)
+
+    def payload(self, ingredients, tag):
+        return {
+            "ingredients": [
+                {"id": ingredient, "amount": 1} for ingredient in ingredients
+            ],
+            "tags": [tag],
+            "name": "benchmark",
+            "text": "benchmark",
+            "cooking_time": 1,
+        }
+
+    def request(self, method, action, data, **kwargs):
+        path = "/api/recipes/{}".format(
+            "{}/".format(kwargs["pk"]) if "pk" in kwargs else ""
+        )
+        request = getattr(self.factory, method)(
+            path, data, format="json", HTTP_HOST=self.host
+        )
+        force_authenticate(request, user=self.user)
+        view = RecipeViewSet.as_view({method: action})
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = view(request, **kwargs)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 300:
+            raise CommandError(f"{action}: {response.data}")
+        return response, elapsed, len(queries)
+
+    def measure(self, ingredients, replacement, tag):
+        """Время и число запросов создания рецепта и замены его
+        ингредиентов."""
+        payload = self.payload(ingredients, tag)
+        payload["image"] = image_data()
+        response, create, create_queries = self.request(
+            "post", "create", payload
+        )
+        recipe_id = response.data["id"]
+        self.images.append(Recipe.objects.get(pk=recipe_id).image)
+        _, update, update_queries = self.request(
+            "patch",
+            "partial_update",
+            self.payload(replacement, tag),
+            pk=recipe_id,
+        )
+        return create, create_queries, update, update_queries
+
+    def report(self, count, results):
+        create, create_queries, update, update_queries = zip(*results)
+        self.stdout.write(
+            "{:>12}  {:>8.1f} ({:>3})         {:>8.1f} ({:>3})".format(
+                count,
+                statistics.median(create) * 1000,
+                max(create_queries),
+                statistics.median(update) * 1000,
+                max(update_queries),
+            )
+        )
@@ -0,0 +1,123 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.views import RecipeViewSet
+from recipes.models import Recipe
+
+User = get_user_model()
+
+MODES = (
+    ("RecipeGetSerializer + JSONRenderer", False, JSONRenderer),
+    ("RecipeReader + ORJSONRenderer", True, ORJSONRenderer),
+)
+
+
+def first_difference(left, right):
+    for position, (a, b) in enumerate(zip(left, right)):
+        if a != b:
+            return position
+    return min(len(left), len(right))
+
+
+class Command(BaseCommand):
+    help = (
+        "compare recipe list/detail output of RecipeGetSerializer and the "
+        "values()-based reader byte for byte and time both"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--user", help="username to render for; anonymous by default"
+        )
+        parser.add_argument("--host", default="localhost")
+
+    def handle(self, *args, **options):
+        ids = Recipe.objects.order_by("-id").values_list("id", flat=True)
+        ids = list(ids[: options["limit"]])
+        if not ids:
+            raise CommandError("Нет рецептов: сначала generate_data")
+        user = AnonymousUser()
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError("Пользователь не найден")
+        targets = {"list": [ids], "retrieve": ids}
+        for action, title in (("list", "Список"), ("retrieve", "Рецепт")):
+            self.stdout.write(f"{title}:")
+            outputs, timings = {}, {}
+            for name, fast, renderer_class in MODES:
+                render = self.get_renderer(
+                    action, fast, renderer_class, user, options["host"]
+                )
+                outputs[name] = [render(target) for target in targets[action]]
+                timings[name] = self.measure(
+                    render, targets[action], options["repeat"]
+                )
+            (base, *_), (fast, *_) = MODES
+            for number, (left, right) in enumerate(
+                zip(outputs[base], outputs[fast])
+            ):
+                if left != right:
+                    position = first_difference(left, right)
+                    window = slice(max(position - 40, 0), position + 40)
+                    raise CommandError(
+                        f"Вывод различается (ответ {number}, байт {position})"
+                        f":\n{left[window]!r}\n{right[window]!r}"
+                    )
+            size = sum(map(len, outputs[base]))
+            self.stdout.write(f"  вывод совпадает байт в байт: {size} байт")
+            for name, _, _ in MODES:
+                self.stdout.write(
+                    "  {}: {:.2f} мс, x{:.1f}".format(
+                        name,
+                        timings[name] * 1000,
+                        timings[base] / timings[name],
+                    )
+                )
+
+    def get_renderer(self, action, fast, renderer_class, user, host):
+        """Функция, которая готовит тело ответа так же, как представление:
+        queryset, сериализатор с контекстом и рендерер — без пагинации."""
+        factory = APIRequestFactory()
+        request = Request(factory.get("/api/recipes/", HTTP_HOST=host))
+        request.user = user
+        renderer = renderer_class()
+
+        def render(target):
+            view = RecipeViewSet(fast_reads=fast)
+            view.request = request
+            view.action = action
+            view.format_kwarg = None
+            view.kwargs = {}
+            queryset = view.get_queryset()
+            if action == "list":
+                instance = list(
+                    queryset.filter(id__in=target).order_by("-id")
+                )
+            else:
+                instance = queryset.get(pk=target)
+            serializer = view.get_serializer(instance, many=action == "list")
+            return renderer.render(serializer.data)
+
+        return render
+
+    def measure(self, render, targets, repeat):
+        """Лучшее из ``repeat`` время одного прохода по всем ответам."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for target in targets:
+                render(target)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+ENDPOINTS = {
+    "favorite": "/api/recipes/{}/favorite/",
+    "shopping_cart": "/api/recipes/{}/shopping_cart/",
+}
+
+# Серверы для --compare: приложение, класс воркера gunicorn и ASYNC_VIEWS.
+SERVERS = {
+    "wsgi": ("foodgram.wsgi:application", "sync", "False"),
+    "asgi": (
+        "foodgram.asgi:application",
+        "uvicorn.workers.UvicornWorker",
+        "True",
+    ),
+}
+SERVER_START_TIMEOUT = 30
+
+
+class Connection:
+    """Минимальный HTTP/1.1-клиент с keep-alive поверх asyncio."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length, close = 0, False
+        while True:
+            line = (await self.reader.readline()).decode("latin1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name = name.lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        "load the favorite/shopping cart toggles over HTTP and report "
+        "throughput and latency percentiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--endpoint", choices=sorted(ENDPOINTS), default="favorite"
+        )
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="start gunicorn WSGI and uvicorn ASGI servers in turn and "
+            "load both with the same settings instead of --url",
+        )
+        parser.add_argument("--port", type=int, default=8100)
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+        if not recipe_ids:
+            raise CommandError("Нет рецептов: сначала generate_data")
+        tokens = self.get_tokens(options["users"])
+        if not options["compare"]:
+            url = urlsplit(options["url"])
+            self.report(
+                self.benchmark(
+                    url.hostname, url.port or 80, tokens, recipe_ids, options
+                ),
+                options,
+            )
+            return
+        summary = {}
+        for name, server in SERVERS.items():
+            self.stdout.write(f"== {name}")
+            with self.server(*server, options):
+                results = self.benchmark(
+                    "127.0.0.1", options["port"], tokens, recipe_ids, options
+                )
+            self.report(results, options)
+            summary[name] = results
+        self.compare(summary)
+
+    def benchmark(self, host, port, tokens, recipe_ids, options):
+        return asyncio.run(
+            self.run(
+                host,
+                port,
+                ENDPOINTS[options["endpoint"]],
+                tokens,
+                recipe_ids,
+                options,
+            )
+        )
+
+    @contextmanager
+    def server(self, application, worker_class, async_views, options):
+        """Запускает gunicorn, ждёт, пока он примет соединение, и
+        останавливает его на выходе."""
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            application,
+            "--worker-class",
+            worker_class,
+            "--workers",
+            str(options["workers"]),
+            "--bind",
+            f"127.0.0.1:{options['port']}",
+        ]
+        process = subprocess.Popen(
+            command,
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, ASYNC_VIEWS=async_views),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_server(process, options["port"])
+            yield
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=SERVER_START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def wait_for_server(self, process, port):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                raise CommandError("Сервер завершился при запуске")
+            try:
+                socket.create_connection(
+                    ("127.0.0.1", port), timeout=1
+                ).close()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise CommandError(
+                        f"Сервер не ответил за {SERVER_START_TIMEOUT} с"
+                    )
+                time.sleep(0.2)
+
+    def get_tokens(self, total):
+        """Токены служебных пользователей: у каждого воркера свой."""
+        tokens = []
+        for number in range(total):
+            user, _ = User.objects.get_or_create(
+                username=f"benchmark{number}",
+                defaults={
+                    "email": f"benchmark{number}@example.com",
+                    "first_name": "Benchmark",
+                    "last_name": str(number),
+                },
+            )
+            tokens.append(Token.objects.get_or_create(user=user)[0].key)
+        return tokens
+
+    async def run(self, host, port, path, tokens, recipe_ids, options):
+        rng = random.Random(options["seed"])
+        deadline = time.monotonic() + options["duration"]
+        latencies, statuses = [], {}
+
+        async def worker(number):
+            connection = Connection(host, port)
+            headers = {
+                "Authorization": "Token " + tokens[number % len(tokens)]
+            }
+            while time.monotonic() < deadline:
+                recipe_path = path.format(rng.choice(recipe_ids))
+                for method in ("GET", "DELETE"):
+                    started = time.perf_counter()
+                    try:
+                        status = await connection.request(
+                            method, recipe_path, headers
+                        )
+                    except (OSError, asyncio.IncompleteReadError, ValueError):
+                        connection.close()
+                        status = "error"
+                    latencies.append(time.perf_counter() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+            connection.close()
+
+        started = time.monotonic()
+        await asyncio.gather(
+            *(worker(number) for number in range(options["concurrency"]))
+        )
+        return latencies, statuses, time.monotonic() - started
+
+    def compare(self, summary):
+        self.stdout.write("== Сравнение")
+        for name, (latencies, statuses, elapsed) in summary.items():
+            latencies = sorted(latencies)
+            self.stdout.write(
+                "{}: {:.1f} запр/с, p99 {:.1f} мс, ошибок {}".format(
+                    name,
+                    len(latencies) / elapsed,
+                    percentile(latencies, 0.99) * 1000 if latencies else 0,
+                    statuses.get("error", 0),
+                )
+            )
+
+    def report(self, results, options):
+        latencies, statuses, elapsed = results
+        if not latencies:
+            raise CommandError("Ни одного ответа за время теста")
+        latencies.sort()
+        self.stdout.write(
+            "Параллельность: {}, длительность: {:.1f} с".format(
+                options["concurrency"], elapsed
+            )
+        )
+        self.stdout.write(
+            "Запросов: {}, {:.1f} запр/с".format(
+                len(latencies), len(latencies) / elapsed
+            )
+        )
+        self.stdout.write(
+            "Задержка, мс: среднее {:.1f}, p50 {:.1f}, p95 {:.1f}, "
+            "p99 {:.1f}, max {:.1f}".format(
+                statistics.mean(latencies) * 1000,
+                percentile(latencies, 0.50) * 1000,
+                percentile(latencies, 0.95) * 1000,
+                percentile(latencies, 0.99) * 1000,
+                latencies[-1] * 1000,
+            )
+        )
+        self.stdout.write(
+            "Статусы: "
+            + ", ".join(
+                f"{status}: {count}"
+                for status, count in sorted(
+                    statuses.items(), key=lambda item: str(item[0])
+                )
+            )
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import similar
+
+
+class Command(BaseCommand):
+    help = (
+        "compute the most similar recipes by shared ingredients for recipes "
+        "changed since the last run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=similar.TOP_K)
+        parser.add_argument(
+            "--metric", choices=sorted(similar.METRICS), default="jaccard"
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="recompute every recipe, not only the changed ones",
+        )
+        parser.add_argument(
+            "--max-ingredient-recipes",
+            type=int,
+            default=similar.MAX_INGREDIENT_RECIPES,
+            help="ingredients used in more recipes do not add candidates",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed, recomputed = similar.update(
+            options["top_k"],
+            options["metric"],
+            options["full"],
+            options["max_ingredient_recipes"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Изменённых рецептов: {}, пересчитано списков: {} "
+                "за {:.1f} с".format(
+                    changed, recomputed, time.monotonic() - started
+                )
+            )
+        )
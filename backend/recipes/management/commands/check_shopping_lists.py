@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import find_drift, rebuild
+from recipes.signals import bulk_changed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "compare stored shopping list totals with the computed ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="rebuild totals of users whose lists drifted",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list("user_id", flat=True))
+            | set(ShoppingListItem.objects.values_list("user_id", flat=True))
+        )
+        drifted = []
+        batch_size = options["batch_size"]
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            stale = find_drift(batch)
+            if stale and options["fix"]:
+                rebuild(stale)
+                bulk_changed.send(sender=ShoppingListItem, user_ids=stale)
+            drifted.extend(stale)
+        message = "Проверено пользователей: {}, расхождений: {}".format(
+            len(user_ids), len(drifted)
+        )
+        if drifted and options["fix"]:
+            message += " (исправлено)"
+        style = self.style.SUCCESS if not drifted else self.style.WARNING
+        self.stdout.write(style(message))
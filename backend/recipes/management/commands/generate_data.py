@@ -0,0 +1,242 @@
+import random
+import time
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from PIL import Image
+
+from recipes import feed, shopping_list
+from recipes.counters import reconcile_counters
+from recipes.images import generate_renditions
+from recipes.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.signals import bulk_changed
+from users.models import Follow
+
+User = get_user_model()
+
+DEFAULT_TAGS = (
+    ("Завтрак", "breakfast", "#E26C2D"),
+    ("Обед", "lunch", "#49B64E"),
+    ("Ужин", "dinner", "#8775D2"),
+)
+WORDS = (
+    "суп", "салат", "пирог", "каша", "рагу", "запеканка", "паста", "омлет",
+    "плов", "борщ", "блины", "котлеты", "жаркое", "тушёные", "печёные",
+    "домашний", "быстрый", "острый", "летний", "сливочный", "овощной",
+)
+
+
+class ZipfSampler:
+    """Выбирает элементы с вероятностью, убывающей как 1 / rank ** s.
+
+    Ранги перемешиваются генератором, так что «популярными» оказываются
+    случайные, но воспроизводимые при том же seed элементы.
+    """
+
+    def __init__(self, rng, items, exponent):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank ** exponent for rank in range(1, len(self.items) + 1)
+            )
+        )
+
+    def sample(self, k):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+    def sample_unique(self, k):
+        k = min(k, len(self.items))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.update(self.sample(k - len(chosen)))
+        return chosen
+
+
+def new_ids(model, last_id):
+    return list(
+        model.objects.filter(id__gt=last_id)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def last_id(model):
+    return model.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+class Command(BaseCommand):
+    help = "generate synthetic users, recipes and relations for load tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--favorites", type=int, default=50000)
+        parser.add_argument("--carts", type=int, default=20000)
+        parser.add_argument("--follows", type=int, default=20000)
+        parser.add_argument("--images", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--exponent", type=float, default=1.1)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        if not ingredient_ids:
+            raise CommandError("Сначала загрузите ингредиенты: load_data")
+        if options["images"] < 1:
+            raise CommandError("Нужно хотя бы одно изображение: --images")
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.exponent = options["exponent"]
+
+        started = time.monotonic()
+        tag_ids = self.create_tags()
+        user_ids = self.create_users(options["users"])
+        images = self.create_images(options["images"])
+        recipe_ids = self.create_recipes(
+            options["recipes"], user_ids, tag_ids, ingredient_ids, images
+        )
+        self.create_relations(
+            Favorite, "recipe_id", options["favorites"], user_ids, recipe_ids
+        )
+        self.create_relations(
+            ShoppingCart, "recipe_id", options["carts"], user_ids, recipe_ids
+        )
+        self.create_relations(
+            Follow, "author_id", options["follows"], user_ids, user_ids
+        )
+        reconcile_counters()
+        feed.rebuild()
+        shopping_list.rebuild(
+            ShoppingCart.objects.values_list("user_id", flat=True).distinct()
+        )
+        for model in (User, Recipe, IngridientInRecipe):
+            bulk_changed.send(sender=model)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Готово за {:.1f} с".format(time.monotonic() - started)
+            )
+        )
+
+    def report(self, model, count):
+        self.stdout.write(f"{model._meta.verbose_name_plural}: +{count}")
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def create_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in DEFAULT_TAGS
+            )
+            bulk_changed.send(sender=Tag)
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_users(self, total):
+        password = make_password("loadtest-password")
+        offset = last_id(User)
+        for start, size in self.batches(total):
+            users = []
+            for number in range(offset + start, offset + start + size):
+                users.append(
+                    User(
+                        username=f"loadtest{number}",
+                        email=f"loadtest{number}@example.com",
+                        first_name=f"Имя{number}",
+                        last_name=f"Фамилия{number}",
+                        password=password,
+                    )
+                )
+            User.objects.bulk_create(users, ignore_conflicts=True)
+        self.report(User, total)
+        return new_ids(User, offset) or list(
+            User.objects.values_list("id", flat=True)
+        )
+
+    def create_images(self, total):
+        images = []
+        for number in range(total):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new("RGB", (1280, 960), color).save(buffer, "JPEG")
+            name = default_storage.save(
+                f"media/loadtest_{number}.jpg", ContentFile(buffer.getvalue())
+            )
+            renditions = generate_renditions(default_storage.open(name))
+            renditions["source"] = name
+            images.append((name, renditions))
+        return images
+
+    def create_recipes(self, total, user_ids, tag_ids, ingredient_ids, images):
+        authors = ZipfSampler(self.rng, user_ids, self.exponent)
+        ingredients = ZipfSampler(self.rng, ingredient_ids, self.exponent)
+        recipe_ids = []
+        for start, size in self.batches(total):
+            first = last_id(Recipe)
+            recipes = []
+            for author_id in authors.sample(size):
+                image, renditions = self.rng.choice(images)
+                words = self.rng.sample(WORDS, 3)
+                recipes.append(
+                    Recipe(
+                        author_id=author_id,
+                        name=" ".join(words).capitalize(),
+                        text=" ".join(self.rng.choices(WORDS, k=40)),
+                        cooking_time=self.rng.randint(5, 180),
+                        image=image,
+                        image_renditions=renditions,
+                    )
+                )
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                ids = new_ids(Recipe, first)
+                IngridientInRecipe.objects.bulk_create(
+                    IngridientInRecipe(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.randint(1, 500),
+                    )
+                    for recipe_id in ids
+                    for ingredient_id in ingredients.sample_unique(
+                        self.rng.randint(3, 12)
+                    )
+                )
+                Recipe.tags.through.objects.bulk_create(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id in ids
+                    for tag_id in self.rng.sample(
+                        tag_ids, self.rng.randint(1, len(tag_ids))
+                    )
+                )
+            recipe_ids.extend(ids)
+        self.report(Recipe, total)
+        return recipe_ids or list(Recipe.objects.values_list("id", flat=True))
+
+    def create_relations(self, model, target, total, user_ids, target_ids):
+        if not user_ids or not target_ids:
+            return
+        users = ZipfSampler(self.rng, user_ids, self.exponent)
+        targets = ZipfSampler(self.rng, target_ids, self.exponent)
+        for start, size in self.batches(total):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, **{target: target_id})
+                    for user_id, target_id in zip(
+                        users.sample(size), targets.sample(size)
+                    )
+                    if user_id != target_id or target == "recipe_id"
+                ),
+                ignore_conflicts=True,
+            )
+        self.report(model, total)
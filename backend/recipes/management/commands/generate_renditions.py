@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.images import delete_renditions, generate_renditions
+from recipes.models import Recipe
+from recipes.signals import bulk_changed
+
+
+class Command(BaseCommand):
+    help = "generate image renditions for recipes that have none"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="regenerate renditions for every recipe",
+        )
+
+    def handle(self, *args, **options):
+        generated = []
+        for recipe in Recipe.objects.exclude(image="").iterator():
+            renditions = recipe.image_renditions or {}
+            if (
+                not options["force"]
+                and renditions.get("source") == recipe.image.name
+            ):
+                continue
+            delete_renditions(renditions)
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_renditions=generate_renditions(recipe.image),
+                updated_at=timezone.now(),
+            )
+            generated.append(recipe.pk)
+        if generated:
+            bulk_changed.send(sender=Recipe, recipe_ids=generated)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Сгенерированы варианты для {len(generated)} рецептов"
+            )
+        )
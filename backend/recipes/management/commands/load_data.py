@@ -1,22 +1,141 @@
-from csv import reader
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
-from django.db.utils import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from recipes.models import Ingredient
+from recipes.models import Ingredient, IngridientInRecipe, Recipe
+from recipes.signals import bulk_changed, touch_recipes
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "data" / "ingredients.csv"
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row == ["name", "measurement_unit"]:
+                continue
+            yield row[0], row[1]
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = json.load(f)
+        for row in rows:
+            yield row["name"], row["measurement_unit"]
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+    ".jsonl": read_json,
+}
 
 
 class Command(BaseCommand):
     help = "load ingredients data to DB"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            type=Path,
+            default=[DEFAULT_PATH],
+            help="CSV, JSON or JSON Lines files with ingredients",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="update measurement units of existing ingredients",
+        )
+
     def handle(self, *args, **options):
-        with open("recipes/data/ingredients.csv", encoding="utf-8") as f:
-            my_reader = reader(f)
-            for row in my_reader:
-                name, measurement_unit = row
-                try:
-                    Ingredient.objects.get_or_create(
-                        name=name, measurement_unit=measurement_unit
+        for path in options["paths"]:
+            if path.suffix not in READERS:
+                raise CommandError(f"Неизвестный формат файла: {path}")
+            if not path.exists():
+                raise CommandError(f"Файл не найден: {path}")
+
+        started = time.monotonic()
+        stats = {"rows": 0, "created": 0, "updated": 0}
+        recipe_ids = set()
+        number = 0
+        with transaction.atomic():
+            for path in options["paths"]:
+                rows = READERS[path.suffix](path)
+                while True:
+                    batch_started = time.monotonic()
+                    batch = dict(islice(rows, options["batch_size"]))
+                    if not batch:
+                        break
+                    recipe_ids |= self.load_batch(
+                        batch, options["update"], stats
                     )
-                except IntegrityError:
-                    print(f"{name} уже есть в БД!")
+                    number += 1
+                    self.report_batch(number, len(batch), batch_started)
+        bulk_changed.send(sender=Ingredient)
+        if recipe_ids:
+            bulk_changed.send(sender=Recipe, recipe_ids=sorted(recipe_ids))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Обработано строк: {rows}, добавлено: {created}, "
+                "обновлено: {updated} за {elapsed:.2f} с "
+                "({speed:.0f} строк/с)".format(
+                    elapsed=elapsed,
+                    speed=stats["rows"] / elapsed if elapsed else 0,
+                    **stats,
+                )
+            )
+        )
+
+    def report_batch(self, number, rows, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            "Пакет {}: {} строк за {:.2f} с ({:.0f} строк/с)".format(
+                number, rows, elapsed, rows / elapsed if elapsed else 0
+            )
+        )
+
+    def load_batch(self, batch, update, stats):
+        """Загружает пакет; возвращает id рецептов, у ингредиентов которых
+        изменились единицы измерения."""
+        stats["rows"] += len(batch)
+        existing = {
+            ingredient.name: ingredient
+            for ingredient in Ingredient.objects.filter(name__in=batch)
+        }
+        new = [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in batch.items()
+            if name not in existing
+        ]
+        Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+        stats["created"] += len(new)
+        if not update:
+            return set()
+        changed = []
+        for name, ingredient in existing.items():
+            if ingredient.measurement_unit != batch[name]:
+                ingredient.measurement_unit = batch[name]
+                changed.append(ingredient)
+        Ingredient.objects.bulk_update(changed, ["measurement_unit"])
+        stats["updated"] += len(changed)
+        if not changed:
+            return set()
+        # Как и сохранение ингредиента, сдвигает updated_at его рецептов:
+        # от него зависят ETag рецепта и инкрементальные пересчёты.
+        touch_recipes(ingredients__in=changed)
+        return set(
+            IngridientInRecipe.objects.filter(
+                ingredient__in=changed
+            ).values_list("recipe_id", flat=True)
+        )
@@ -0,0 +1,84 @@
+import json
+
+import psycopg2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.metrics import COUNTERS, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "show database connection statistics: PostgreSQL sessions or "
+        "PgBouncer pools, plus the counters collected by the workers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--pgbouncer",
+            action="store_true",
+            help="query the PgBouncer admin console (SHOW POOLS)",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("Статистика доступна только для PostgreSQL")
+        pooled = options["pgbouncer"] or connection.settings_dict.get(
+            "DISABLE_SERVER_SIDE_CURSORS"
+        )
+        if pooled:
+            self.show_pgbouncer(connection)
+        else:
+            self.show_sessions(connection)
+        self.show_counters()
+
+    def show_sessions(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW max_connections")
+            limit = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT coalesce(state, 'unknown'), count(*) "
+                "FROM pg_stat_activity WHERE datname = current_database() "
+                "GROUP BY 1 ORDER BY 1"
+            )
+            rows = cursor.fetchall()
+        self.stdout.write(f"Соединения PostgreSQL (max_connections={limit}):")
+        for state, count in rows:
+            self.stdout.write(f"  {state}: {count}")
+
+    def show_pgbouncer(self, connection):
+        # Консоль PgBouncer — отдельная «база» pgbouncer, без транзакций.
+        params = connection.get_connection_params()
+        params["database"] = "pgbouncer"
+        admin = psycopg2.connect(**params)
+        admin.autocommit = True
+        try:
+            with admin.cursor() as cursor:
+                cursor.execute("SHOW POOLS")
+                columns = [column.name for column in cursor.description]
+                rows = cursor.fetchall()
+        finally:
+            admin.close()
+        self.stdout.write("Пулы PgBouncer:")
+        for row in rows:
+            self.stdout.write(
+                "  " + ", ".join(f"{k}={v}" for k, v in zip(columns, row))
+            )
+
+    def show_counters(self):
+        if not settings.METRICS_DIR:
+            self.stdout.write(
+                "Счётчики воркеров недоступны: не задан METRICS_DIR"
+            )
+            return
+        totals = dict.fromkeys(COUNTERS, 0)
+        for key, counts in registry.collect().items():
+            name, _ = json.loads(key)
+            if name in totals:
+                totals[name] += counts[0]
+        self.stdout.write("Счётчики воркеров:")
+        for name, value in totals.items():
+            self.stdout.write(f"  {name}: {value}")
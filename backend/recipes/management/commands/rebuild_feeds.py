@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = (
+        "rebuild stored subscription feeds, e.g. after bulk imports or a "
+        "FEED_FANOUT_FOLLOWING change"
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        owners = feed.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Собрано лент: {} (порог {} подписок) за {:.1f} с".format(
+                    owners,
+                    settings.FEED_FANOUT_FOLLOWING,
+                    time.monotonic() - started,
+                )
+            )
+        )
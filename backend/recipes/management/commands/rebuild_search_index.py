@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import fulltext
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "rebuild the full-text search index of recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        recipe_ids = list(Recipe.objects.values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(recipe_ids), batch_size):
+            with transaction.atomic():
+                fulltext.update_index(recipe_ids[start:start + batch_size])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Проиндексировано рецептов: {} за {:.1f} с".format(
+                    len(recipe_ids), time.monotonic() - started
+                )
+            )
+        )
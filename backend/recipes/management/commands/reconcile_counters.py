@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "recalculate denormalized popularity counters"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes, authors = reconcile_counters()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Исправлено рецептов: {recipes}, авторов: {authors}"
+            )
+        )
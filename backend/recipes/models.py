@@ -1,5 +1,7 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -50,6 +52,18 @@ class Tag(models.Model):
         return self.slug
 
 
+class SearchVectorIndex(GinIndex):
+    """GIN-индекс в PostgreSQL; в других базах — обычный индекс, чтобы
+    миграции проходили и в SQLite, где поиск идёт через FTS5."""
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().create_sql(model, schema_editor, using, **kwargs)
+        return models.Index.create_sql(
+            self, model, schema_editor, using, **kwargs
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -60,6 +74,12 @@ class Recipe(models.Model):
     image = models.ImageField(
         upload_to="media/", verbose_name="Фотография готового блюда"
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Варианты фотографии",
+    )
     text = models.TextField(verbose_name="Описание блюда")
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1)],
@@ -71,9 +91,37 @@ class Recipe(models.Model):
     tags = models.ManyToManyField(
         Tag, related_name="recipe", verbose_name="Теги"
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name="В избранном",
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В списках покупок",
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения"
+    )
+    similar_computed_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name="Похожие рецепты рассчитаны",
+    )
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(
+                fields=["author", "-id"], name="recipe_author_newest_idx"
+            ),
+            SearchVectorIndex(
+                fields=["search_vector"], name="recipe_search_vector_gin"
+            ),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -138,3 +186,90 @@ class ShoppingCart(models.Model):
         unique_together = ("user", "recipe")
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
+
+
+class ShoppingListItem(models.Model):
+    """Итог по ингредиенту в списке покупок пользователя.
+
+    Поддерживается инкрементально при изменении корзины и ингредиентов
+    рецептов, см. ``recipes.shopping_list``.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Ингредиент",
+    )
+    amount = models.IntegerField(verbose_name="Количество")
+
+    class Meta:
+        unique_together = ("user", "ingredient")
+        verbose_name = "Позиция списка покупок"
+        verbose_name_plural = "Позиции списков покупок"
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Ленты хранятся только у тех, кто подписан на много авторов; они
+    заполняются при публикации рецепта и при подписке, см.
+    ``recipes.feed``.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+
+    class Meta:
+        unique_together = ("user", "recipe")
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи лент"
+
+
+class SimilarRecipe(models.Model):
+    """Один из самых похожих на рецепт по ингредиентам рецептов.
+
+    Заполняется командой ``build_similar_recipes``, см. ``recipes.similar``.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_to",
+        verbose_name="Похожий рецепт",
+    )
+    position = models.PositiveSmallIntegerField(verbose_name="Место")
+    score = models.FloatField(verbose_name="Сходство")
+
+    class Meta:
+        unique_together = ("recipe", "position")
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
@@ -0,0 +1,270 @@
+"""«Что приготовить»: рецепты, которые покрывает набор ингредиентов.
+
+Инвертированный индекс в памяти процесса: для каждого ингредиента —
+битовая маска рецептов, где бит ``p`` соответствует рецепту с id ``p``.
+Число ингредиентов из запроса в каждом рецепте считается побитовым
+сумматором сразу для всех рецептов, а рецепты с одинаковыми (есть,
+всего) собираются пересечением масок, поэтому запрос не обходит ни
+рецепты, ни ``IngridientInRecipe``.
+
+Индекс строится лениво при первом запросе. Изменения состава рецептов
+приходят из сигналов ``IngridientInRecipe``: после коммита состав рецептов
+перечитывается из базы и публикуется в кэше Django под новой версией
+индекса. Процессы применяют опубликованные изменения к своему индексу, а
+если какие-то из них уже вытеснены из кэша, перестраивают индекс целиком.
+Индекс читается только из основной базы: отстающая реплика оставила бы в
+нём старый состав под новой версией.
+"""
+import threading
+from collections import defaultdict
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db import (DEFAULT_DB_ALIAS, DatabaseError, connections,
+                       transaction)
+
+from .bitsets import (bit_count, bit_positions, bitmask, count_masks,
+                      equal_mask)
+from .models import IngridientInRecipe
+
+INDEX_VERSION_KEY = "pantry_index_version"
+CHANGE_KEY = "pantry_index_change:{}"
+CHANGE_TIMEOUT = 24 * 60 * 60
+# Отставшему дальше процессу дешевле перестроить индекс.
+MAX_CHANGES = 1000
+
+
+class PantryMatches:
+    """Подходящие рецепты в порядке выдачи; срезы отдают кортежи
+    ``(recipe_id, есть, всего)`` и годятся для пагинатора Django."""
+
+    def __init__(self, groups):
+        self._groups = groups
+        self._count = sum(bit_count(mask) for mask, _, _ in groups)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("PantryMatches поддерживает только срезы")
+        start, stop, _ = key.indices(self._count)
+        skip, need = start, stop - start
+        result = []
+        for mask, matched, size in self._groups:
+            if need <= 0:
+                break
+            count = bit_count(mask)
+            if skip >= count:
+                skip -= count
+                continue
+            for recipe_id in islice(bit_positions(mask), skip, skip + need):
+                result.append((recipe_id, matched, size))
+            need -= min(count - skip, need)
+            skip = 0
+        return result
+
+
+class Snapshot(NamedTuple):
+    """Неизменяемое состояние индекса: его не меняют на месте, а заменяют
+    новым целиком."""
+
+    version: Optional[int]
+    recipes: dict
+    columns: dict
+    sizes: dict
+
+
+EMPTY = Snapshot(None, {}, {}, {})
+
+
+def build_snapshot(version, pairs):
+    recipes = defaultdict(set)
+    for recipe_id, ingredient_id in pairs:
+        recipes[recipe_id].add(ingredient_id)
+    length = max(recipes, default=0) + 1
+    columns, sizes = defaultdict(list), defaultdict(list)
+    for recipe_id, ingredients in recipes.items():
+        sizes[len(ingredients)].append(recipe_id)
+        for ingredient_id in ingredients:
+            columns[ingredient_id].append(recipe_id)
+    return Snapshot(
+        version,
+        {pk: frozenset(items) for pk, items in recipes.items()},
+        {pk: bitmask(ids, length) for pk, ids in columns.items()},
+        {size: bitmask(ids, length) for size, ids in sizes.items()},
+    )
+
+
+def replace_recipes(snapshot, version, changes):
+    """Копия снимка, где у рецептов из ``changes`` (пары id и набор
+    ингредиентов) новый состав."""
+    recipes = dict(snapshot.recipes)
+    columns = dict(snapshot.columns)
+    sizes = dict(snapshot.sizes)
+    for recipe_id, ingredients in changes:
+        ingredients = frozenset(ingredients)
+        bit = 1 << recipe_id
+        old = recipes.pop(recipe_id, frozenset())
+        if old:
+            sizes[len(old)] &= ~bit
+        if ingredients:
+            recipes[recipe_id] = ingredients
+            sizes[len(ingredients)] = sizes.get(len(ingredients), 0) | bit
+        for ingredient_id in old - ingredients:
+            columns[ingredient_id] &= ~bit
+        for ingredient_id in ingredients - old:
+            columns[ingredient_id] = columns.get(ingredient_id, 0) | bit
+    return Snapshot(version, recipes, columns, sizes)
+
+
+class PantryIndex:
+    """Индекс хранит один ``Snapshot`` и подменяет его одним присваиванием;
+    запрос берёт ссылку на снимок один раз и не видит его перестройку."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = threading.local()
+        self._snapshot = EMPTY
+
+    def invalidate(self):
+        self._snapshot = EMPTY
+        try:
+            cache.incr(INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(INDEX_VERSION_KEY, 1, None)
+
+    def build(self, version=None):
+        return build_snapshot(
+            version,
+            IngridientInRecipe.objects.using(DEFAULT_DB_ALIAS)
+            .order_by()
+            .values_list("recipe_id", "ingredient_id")
+            .iterator(),
+        )
+
+    def _ensure_fresh(self):
+        version = cache.get_or_set(INDEX_VERSION_KEY, 0, None)
+        snapshot = self._snapshot
+        if version == snapshot.version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if version != snapshot.version:
+                snapshot = self._replay(snapshot, version) or self.build(
+                    version
+                )
+                self._snapshot = snapshot
+            return snapshot
+
+    def _replay(self, snapshot, version):
+        """Снимок с опубликованными изменениями до ``version``; ``None``,
+        если их уже нет в кэше и индекс нужно перестроить."""
+        if snapshot.version is None or not (
+            0 < version - snapshot.version <= MAX_CHANGES
+        ):
+            return None
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(snapshot.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return replace_recipes(
+            snapshot,
+            version,
+            [change for key in keys for change in changes[key]],
+        )
+
+    def refresh(self, recipe_ids):
+        """Перечитывает из базы состав рецептов ``recipe_ids`` и публикует
+        его для остальных процессов.
+
+        Версия берётся до чтения базы: тогда у изменения с наибольшей
+        версией и состав самый свежий, даже если процессы публикуют свои
+        изменения не в том порядке, в каком их прочитали.
+        """
+        with self._lock:
+            try:
+                version = cache.incr(INDEX_VERSION_KEY)
+            except ValueError:
+                cache.set(INDEX_VERSION_KEY, 1, None)
+                self._snapshot = EMPTY
+                return
+            recipes = {pk: set() for pk in recipe_ids}
+            rows = IngridientInRecipe.objects.using(DEFAULT_DB_ALIAS).filter(
+                recipe_id__in=recipes
+            )
+            for recipe_id, ingredient_id in rows.values_list(
+                "recipe_id", "ingredient_id"
+            ):
+                recipes[recipe_id].add(ingredient_id)
+            change = [(pk, tuple(items)) for pk, items in recipes.items()]
+            cache.set(CHANGE_KEY.format(version), change, CHANGE_TIMEOUT)
+            snapshot = self._snapshot
+            if snapshot.version is not None and (
+                version == snapshot.version + 1
+            ):
+                self._snapshot = replace_recipes(snapshot, version, change)
+
+    def refresh_on_commit(self, recipe_ids):
+        """Откладывает ``refresh`` до коммита; рецепты из нескольких
+        сигналов одной транзакции перечитываются одним запросом."""
+        self._pending.__dict__.setdefault("recipe_ids", set()).update(
+            recipe_ids
+        )
+        transaction.on_commit(self._flush)
+
+    def _flush(self):
+        recipe_ids = self._pending.__dict__.pop("recipe_ids", None)
+        if recipe_ids:
+            self.refresh(recipe_ids)
+
+    def match(self, ingredient_ids, max_missing=None):
+        """Рецепты, где есть хотя бы один из ``ingredient_ids``.
+
+        Сначала рецепты с большей долей имеющихся ингредиентов, при равной
+        доле — с меньшим числом недостающих, затем новые.
+        """
+        index = self._ensure_fresh()
+        masks = [
+            index.columns[pk]
+            for pk in set(ingredient_ids)
+            if pk in index.columns
+        ]
+        digits = count_masks(masks)
+        full = 0
+        for mask in masks:
+            full |= mask
+        limit = float("inf") if max_missing is None else max_missing
+        groups = []
+        for matched in range(1, len(masks) + 1):
+            mask = equal_mask(digits, matched, full)
+            if not mask:
+                continue
+            for size, members in index.sizes.items():
+                group = mask & members
+                if group and 0 <= size - matched <= limit:
+                    groups.append((group, matched, size))
+        groups.sort(key=lambda group: (-group[1] / group[2], group[2]))
+        return PantryMatches(groups)
+
+
+pantry_index = PantryIndex()
+
+
+def warm_up():
+    """Строит индекс при старте воркера (см. ``foodgram.wsgi``), чтобы
+    первый запрос не ждал полного чтения ``IngridientInRecipe``."""
+    try:
+        pantry_index._ensure_fresh()
+    except DatabaseError:
+        # База ещё не готова, например до migrate: индекс построится при
+        # первом запросе.
+        pass
+    finally:
+        # С gunicorn --preload это код мастера: соединение не должно
+        # достаться форкнутым воркерам.
+        connections.close_all()
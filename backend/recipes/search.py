@@ -0,0 +1,210 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max
+
+from .models import Ingredient
+
+INDEX_VERSION_KEY = "ingredient_index_version"
+# С локальным кэшем Django версия не доходит до других процессов, например
+# из load_data. Поэтому раз в CHECK_INTERVAL секунд число и наибольший id
+# ингредиентов сверяются с базой, а старше SNAPSHOT_TTL секунд снимок
+# перестраивается в любом случае: так видны и правки названий.
+CHECK_INTERVAL = 10
+SNAPSHOT_TTL = 300
+FUZZY_THRESHOLD = 0.3
+FUZZY_LIMIT = 10
+
+LATIN_TO_CYRILLIC = str.maketrans(
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,.`",
+    "йцукенгшщзхъфывапролджэячсмитьбюё",
+)
+CYRILLIC_TO_LATIN = str.maketrans(
+    "йцукенгшщзхъфывапролджэячсмитьбюё",
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,.`",
+)
+
+
+def normalize(value):
+    return " ".join(value.lower().replace("ё", "е").split())
+
+
+def trigrams(value, padded=True):
+    if padded:
+        value = "  {} ".format(value)
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class Snapshot(NamedTuple):
+    entries: tuple
+    names: tuple
+    sizes: tuple
+    postings: dict
+    version: Optional[int] = None
+    fingerprint: tuple = ()
+    built_at: float = float("-inf")
+
+
+EMPTY = Snapshot((), (), (), {})
+
+
+def fingerprint():
+    values = Ingredient.objects.using(DEFAULT_DB_ALIAS).aggregate(
+        count=Count("id"), last=Max("id")
+    )
+    return values["count"], values["last"]
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Выдаёт сначала совпадения по началу названия, затем по подстроке и в
+    конце похожие названия по триграммам, что покрывает опечатки и
+    запросы, набранные в неправильной раскладке клавиатуры. Индекс
+    перестраивается лениво, когда меняется версия в кэше Django (после
+    коммита изменивших ингредиенты транзакций) или содержимое таблицы.
+    Строки читаются из основной базы, а не с реплики, которая может
+    отставать от версии.
+
+    Данные индекса — один неизменяемый ``Snapshot``: перестройка собирает
+    новый и подменяет его одним присваиванием, а поиск берёт ссылку один
+    раз, поэтому параллельные запросы не видят недостроенный индекс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = EMPTY
+        self._checked_at = float("-inf")
+
+    def invalidate(self):
+        # До коммита другой процесс перестроил бы индекс по старым строкам
+        # и пометил его новой версией.
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        self._snapshot = EMPTY
+        try:
+            cache.incr(INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(INDEX_VERSION_KEY, 1, None)
+
+    @staticmethod
+    def build(version=None):
+        rows = sorted(
+            (normalize(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.using(
+                DEFAULT_DB_ALIAS
+            ).values_list("id", "name", "measurement_unit")
+        )
+        postings = defaultdict(set)
+        for position, row in enumerate(rows):
+            for gram in trigrams(row[0]):
+                postings[gram].add(position)
+        names = tuple(row[0] for row in rows)
+        last = max((row[1] for row in rows), default=None)
+        return Snapshot(
+            entries=tuple(
+                {"id": pk, "name": name, "measurement_unit": measurement_unit}
+                for _, pk, name, measurement_unit in rows
+            ),
+            names=names,
+            sizes=tuple(len(trigrams(name)) for name in names),
+            postings={
+                gram: frozenset(positions)
+                for gram, positions in postings.items()
+            },
+            version=version,
+            fingerprint=(len(rows), last),
+            built_at=time.monotonic(),
+        )
+
+    def _is_fresh(self, snapshot, version, now):
+        if version != snapshot.version:
+            return False
+        if now - snapshot.built_at > SNAPSHOT_TTL:
+            return False
+        if now - self._checked_at < CHECK_INTERVAL:
+            return True
+        self._checked_at = now
+        return fingerprint() == snapshot.fingerprint
+
+    def _ensure_fresh(self):
+        # Версия читается до строк: снимок не может получить версию новее
+        # данных, из которых он построен.
+        version = cache.get_or_set(INDEX_VERSION_KEY, 0, None)
+        started = time.monotonic()
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, version, started):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            # Пока ждали блокировку, индекс мог перестроить другой поток.
+            if snapshot.version != version or snapshot.built_at < started:
+                snapshot = self.build(version)
+                self._snapshot = snapshot
+                self._checked_at = snapshot.built_at
+            return snapshot
+
+    @staticmethod
+    def _prefix(index, query):
+        start = bisect_left(index.names, query)
+        end = start
+        while end < len(index.names) and index.names[end].startswith(query):
+            end += 1
+        return range(start, end)
+
+    @staticmethod
+    def _substring(index, query):
+        grams = trigrams(query, padded=False)
+        if not grams:
+            candidates = range(len(index.names))
+        else:
+            postings = sorted(
+                (index.postings.get(gram, frozenset()) for gram in grams),
+                key=len,
+            )
+            candidates = sorted(frozenset.intersection(*postings))
+        return [i for i in candidates if query in index.names[i]]
+
+    @staticmethod
+    def _fuzzy(index, query):
+        grams = trigrams(query)
+        hits = defaultdict(int)
+        for gram in grams:
+            for position in index.postings.get(gram, ()):
+                hits[position] += 1
+        scored = []
+        for position, common in hits.items():
+            total = len(grams) + index.sizes[position] - common
+            score = common / total
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, position))
+        return [position for _, position in sorted(scored)[:FUZZY_LIMIT]]
+
+    def search(self, query):
+        index = self._ensure_fresh()
+        query = normalize(query)
+        if not query:
+            return list(index.entries)
+        variants = [query]
+        for table in (LATIN_TO_CYRILLIC, CYRILLIC_TO_LATIN):
+            variant = normalize(query.translate(table))
+            if variant not in variants:
+                variants.append(variant)
+        seen = set()
+        result = []
+        for lookup in (self._prefix, self._substring, self._fuzzy):
+            for variant in variants:
+                for position in lookup(index, variant):
+                    if position not in seen:
+                        seen.add(position)
+                        result.append(index.entries[position])
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import IngridientInRecipe, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_id):
+    return recipes_amounts([recipe_id])
+
+
+def recipes_amounts(recipe_ids):
+    """Суммарное количество каждого ингредиента в наборе рецептов."""
+    return Counter(
+        dict(
+            IngridientInRecipe.objects.filter(recipe_id__in=recipe_ids)
+            .values("ingredient_id")
+            .annotate(total=Sum("amount"))
+            .order_by()
+            .values_list("ingredient_id", "total")
+        )
+    )
+
+
+def computed_totals(user_ids):
+    """Итоги, посчитанные заново через корзину и ингредиенты рецептов."""
+    totals = {}
+    rows = (
+        IngridientInRecipe.objects.filter(
+            recipe__shopping_cart__user_id__in=user_ids
+        )
+        .values("recipe__shopping_cart__user_id", "ingredient_id")
+        .annotate(total=Sum("amount"))
+        .order_by()
+        .values_list(
+            "recipe__shopping_cart__user_id", "ingredient_id", "total"
+        )
+    )
+    for user_id, ingredient_id, total in rows:
+        totals.setdefault(user_id, Counter())[ingredient_id] = total
+    return totals
+
+
+def stored_totals(user_ids):
+    totals = {}
+    rows = ShoppingListItem.objects.filter(user_id__in=user_ids).values_list(
+        "user_id", "ingredient_id", "amount"
+    )
+    for user_id, ingredient_id, amount in rows:
+        totals.setdefault(user_id, Counter())[ingredient_id] = amount
+    return totals
+
+
+@transaction.atomic
+def change_totals(user_ids, deltas):
+    """Прибавляет ``deltas`` (ingredient_id -> количество) к спискам
+    пользователей ``user_ids``: число запросов не зависит ни от числа
+    ингредиентов, ни от числа пользователей."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas or not user_ids:
+        return
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+    }
+    changed, created, emptied = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    created.append(
+                        ShoppingListItem(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta,
+                        )
+                    )
+                continue
+            item.amount += delta
+            (changed if item.amount > 0 else emptied).append(item)
+    ShoppingListItem.objects.bulk_update(changed, ["amount"])
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.filter(
+        pk__in=[item.pk for item in emptied]
+    ).delete()
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    add_recipes(user_id, [recipe_id], sign)
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    amounts = recipes_amounts(recipe_ids)
+    change_totals(
+        [user_id], {key: sign * value for key, value in amounts.items()}
+    )
+
+
+def change_recipe_totals(recipe_id, deltas):
+    """Переносит изменение ингредиентов рецепта на списки всех
+    пользователей, у которых он в корзине."""
+    if not any(deltas.values()):
+        return
+    change_totals(
+        list(
+            ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+                "user_id", flat=True
+            )
+        ),
+        deltas,
+    )
+
+
+def find_drift(user_ids):
+    """Пользователи, у которых сохранённый список расходится с расчётным."""
+    computed = computed_totals(user_ids)
+    stored = stored_totals(user_ids)
+    return [
+        user_id
+        for user_id in user_ids
+        if computed.get(user_id, Counter()) != stored.get(user_id, Counter())
+    ]
+
+
+@transaction.atomic
+def rebuild(user_ids):
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for user_id, totals in computed_totals(user_ids).items()
+        for ingredient_id, amount in totals.items()
+    )
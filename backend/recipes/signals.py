@@ -0,0 +1,263 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from users.models import Follow
+
+from . import feed, fulltext, similar
+from .counters import (RECIPE_COUNTERS, change_author_counter,
+                       change_recipe_counter)
+from .images import delete_renditions, generate_renditions
+from .models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
+                     ShoppingCart, Tag)
+from .pantry import pantry_index
+from .search import ingredient_index
+from .shopping_list import add_recipe
+
+User = get_user_model()
+
+# Отправляется с sender=модель после bulk_create/bulk_update/update(),
+# которые не вызывают post_save. Необязательный recipe_ids перечисляет
+# рецепты, которых коснулось изменение.
+bulk_changed = Signal()
+
+_bulk_lists = threading.local()
+
+
+@contextmanager
+def lists_changed_in_bulk():
+    """Удаления из избранного и списка покупок внутри блока не меняют
+    счётчики рецептов и итоги списка: вызывающий код делает это сам, одним
+    запросом на весь набор."""
+    _bulk_lists.active = True
+    try:
+        yield
+    finally:
+        _bulk_lists.active = False
+
+
+def in_bulk_lists():
+    return getattr(_bulk_lists, "active", False)
+
+
+# Поля автора, которые видны в ответе с рецептом.
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name"}
+
+
+def author_values(user):
+    # Из __dict__: отложенные поля не загружаются лишним запросом.
+    return {name: user.__dict__.get(name) for name in AUTHOR_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def remember_author_values(sender, instance, **kwargs):
+    instance._author_values = author_values(instance)
+
+
+def author_changed(user, created=False, update_fields=None):
+    """Изменилось ли сохранением что-то из того, что видно об авторе в
+    ответах с рецептами; вход и смена пароля ничего не меняют."""
+    if created:
+        return False
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return False
+    return user._author_values != author_values(user)
+
+
+@receiver([post_save, post_delete, bulk_changed], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=IngridientInRecipe)
+def update_pantry_index(sender, instance, **kwargs):
+    pantry_index.refresh_on_commit([instance.recipe_id])
+
+
+@receiver(bulk_changed, sender=IngridientInRecipe)
+def refresh_pantry_index(sender, recipe_ids=None, **kwargs):
+    if recipe_ids is None:
+        pantry_index.invalidate()
+    else:
+        pantry_index.refresh_on_commit(recipe_ids)
+
+
+def has_stale_renditions(recipe):
+    renditions = recipe.image_renditions or {}
+    return bool(recipe.image) and (
+        renditions.get("source") != recipe.image.name
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def update_image_renditions(sender, instance, **kwargs):
+    # Варианты рендерятся после коммита: загрузка большой фотографии не
+    # держит открытой транзакцию запроса. До этого отдаётся оригинал.
+    if has_stale_renditions(instance):
+        transaction.on_commit(partial(render_image_renditions, instance.pk))
+
+
+def render_image_renditions(recipe_id):
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .only("image", "image_renditions")
+        .first()
+    )
+    if recipe is None or not has_stale_renditions(recipe):
+        return
+    renditions = generate_renditions(recipe.image)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_renditions=renditions, updated_at=timezone.now())
+    if not updated:
+        # Фотографию успели заменить или рецепт удалён.
+        delete_renditions(renditions)
+        return
+    delete_renditions(recipe.image_renditions or {})
+    bulk_changed.send(sender=Recipe, recipe_ids=[recipe_id])
+
+
+@receiver(bulk_changed, sender=Recipe)
+def rebuild_search_index(sender, recipe_ids=None, **kwargs):
+    fulltext.update_index(recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        fulltext.update_index(
+            Recipe.objects.filter(ingredients=instance).values_list(
+                "pk", flat=True
+            )
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_search_index(sender, instance, **kwargs):
+    fulltext.remove_from_index(instance.pk)
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_similar_stale(sender, instance, **kwargs):
+    similar.mark_stale(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_renditions(sender, instance, **kwargs):
+    delete_renditions(instance.image_renditions or {})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def increment_counters(sender, instance, created, **kwargs):
+    if created:
+        change_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def decrement_counters(sender, instance, **kwargs):
+    if sender in RECIPE_COUNTERS and in_bulk_lists():
+        return
+    change_counters(sender, instance, -1)
+
+
+def change_counters(sender, instance, delta):
+    if sender in RECIPE_COUNTERS:
+        change_recipe_counter(
+            instance.recipe_id, RECIPE_COUNTERS[sender], delta
+        )
+    elif sender is Recipe:
+        change_author_counter(instance.author_id, "recipes_count", delta)
+    elif sender is Follow:
+        change_author_counter(instance.author_id, "followers_count", delta)
+        change_author_counter(instance.user_id, "following_count", delta)
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        feed.add_recipe(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_feed(sender, instance, **kwargs):
+    feed.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    if in_bulk_lists():
+        return
+    add_recipe(instance.user_id, instance.recipe_id, sign=-1)
+
+
+def touch_recipes(**filters):
+    """Сдвигает ``updated_at`` рецептов, чьё представление изменилось не
+    через сохранение самого рецепта."""
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(bulk_changed, sender=IngridientInRecipe)
+def touch_recipe_ingredients(sender, recipe_ids=None, **kwargs):
+    # Один UPDATE на запрос, а не на каждую строку состава: построчные
+    # post_save/post_delete здесь не обрабатываются.
+    if recipe_ids is not None:
+        touch_recipes(pk__in=recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove"):
+        if reverse:
+            touch_recipes(pk__in=pk_set)
+        else:
+            touch_recipes(pk=instance.pk)
+    elif action == "pre_clear":
+        if reverse:
+            touch_recipes(tags=instance)
+        else:
+            touch_recipes(pk=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    if author_changed(instance, created, update_fields):
+        touch_recipes(author=instance)
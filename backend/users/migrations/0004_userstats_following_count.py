@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 17:16
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_following_count(apps, schema_editor):
+    Follow = apps.get_model("users", "Follow")
+    UserStats = apps.get_model("users", "UserStats")
+    UserStats.objects.update(
+        following_count=Coalesce(
+            Subquery(
+                Follow.objects.filter(user=OuterRef("pk"))
+                .order_by()
+                .values("user")
+                .annotate(count=Count("pk"))
+                .values("count"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_userstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userstats",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Подписок"
+            ),
+        ),
+        migrations.RunPython(fill_following_count, migrations.RunPython.noop),
+    ]
@@ -25,3 +25,29 @@ class Follow(models.Model):
 
     def __str__(self):
         return "{} подписан на {}".format(self.user, self.author)
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0, verbose_name="Рецептов"
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name="Подписчиков"
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="Подписок"
+    )
+
+    class Meta:
+        verbose_name = "Статистика автора"
+        verbose_name_plural = "Статистика авторов"
+
+    def __str__(self):
+        return "Статистика {}".format(self.user)